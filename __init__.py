@@ -85,18 +85,16 @@ Features:
 
 import os
 import bpy
-import bgl
-import gpu
 import math
 from bpy_extras.io_utils import ImportHelper
 from bpy.app.handlers import persistent
-from gpu_extras.batch import batch_for_shader
 
 from . import cuts
 from . import fades
 from . import grabs
 from . import markers
 from . import parenting
+from . import profiling
 from . import shortcuts
 from . import snaps
 from . import tags
@@ -126,10 +124,15 @@ vseqf_draw_handler = None
 vu_meter_draw_handler = None
 frame_step_handler = None
 continuous_handler = None
+default_keymap_replaced = False
+
+#Names of the strips seen by the last run of vseqf_continuous, used to find only the strips that changed since then
+continuous_snapshot = None
+continuous_snapshot_scene = None
 
 classes = []
 
-classes = classes + [cuts.VSEQFCut, cuts.VSEQFQuickCutsMenu, cuts.VSEQF_PT_QuickCutsPanel, cuts.VSEQFDelete,
+classes = classes + [cuts.VSEQFCut, cuts.VSEQFBatchCut, cuts.VSEQFQuickCutsMenu, cuts.VSEQF_PT_QuickCutsPanel, cuts.VSEQFDelete,
                      cuts.VSEQFDeleteConfirm, cuts.VSEQFDeleteRippleConfirm]
 classes = classes + [fades.VSEQFModalFades, fades.VSEQF_PT_QuickFadesPanel, fades.VSEQFQuickFadesMenu,
                      fades.VSEQFQuickFadesSet, fades.VSEQFQuickFadesClear, fades.VSEQFQuickFadesCross,
@@ -144,6 +147,8 @@ classes = classes + [markers.VSEQF_PT_QuickMarkersPanel, markers.VSEQF_UL_QuickM
                      markers.VSEQFQuickMarkersAddPreset, markers.VSEQFMarkerPreset]
 classes = classes + [parenting.VSEQF_PT_Parenting, parenting.VSEQFQuickParentsMenu, parenting.VSEQFQuickParents,
                      parenting.VSEQFQuickParentsClear]
+classes = classes + [profiling.VSEQF_PT_Profiling, profiling.VSEQFProfilingToggle, profiling.VSEQFProfilingClear,
+                     profiling.VSEQFProfilingExport]
 classes = classes + [snaps.VSEQFQuickSnapsMenu, snaps.VSEQFQuickSnaps]
 classes = classes + [shortcuts.VSEQFQuickShortcutsNudge, shortcuts.VSEQFQuickShortcutsSpeed,
                      shortcuts.VSEQFQuickShortcutsSkip, shortcuts.VSEQFQuickShortcutsResetPlay]
@@ -151,7 +156,7 @@ classes = classes + [tags.VSEQFQuickTagsMenu, tags.VSEQF_PT_QuickTagsPanel, tags
                      tags.VSEQF_UL_QuickTagList, tags.VSEQFQuickTagsClear, tags.VSEQFQuickTagsSelect,
                      tags.VSEQFQuickTagsRemoveFrom, tags.VSEQFQuickTagsRemove, tags.VSEQFQuickTagsStripMarkerMenu,
                      tags.VSEQFQuickTagsAdd, tags.VSEQFQuickTagsAddActive, tags.VSEQFTags, tags.VSEQFQuickTagsAddMarker,
-                     tags.VSEQFQuickTagsRemoveMarker]
+                     tags.VSEQFQuickTagsRemoveMarker, tags.VSEQFQuickTagsRefresh, tags.VSEQFQuickTagsQuery]
 classes = classes + [threepoint.VSEQF_PT_ThreePointBrowserPanel, threepoint.VSEQFThreePointImportToClip,
                      threepoint.VSEQF_PT_ThreePointPanel, threepoint.VSEQFThreePointImport,
                      threepoint.VSEQFThreePointOperator, threepoint.VSEQFQuick3PointValues]
@@ -337,13 +342,7 @@ class VSEQF_PT_CompactEdit(bpy.types.Panel):
 
         if prefs.fades:
             #display info about the fade in and out of the current sequence
-            fade_curve = fades.get_fade_curve(context, strip, create=False)
-            if fade_curve:
-                fadein = fades.fades(fade_curve, strip, 'detect', 'in')
-                fadeout = fades.fades(fade_curve, strip, 'detect', 'out')
-            else:
-                fadein = 0
-                fadeout = 0
+            fadein, fadeout = fades.get_fade_lengths(strip, context)
 
             row = layout.row()
             if fadein > 0:
@@ -667,11 +666,47 @@ class VSEQFImport(bpy.types.Operator, ImportHelper):
 
 
 #Functions related to continuous update
+def reset_continuous_snapshot():
+    global continuous_snapshot
+    global continuous_snapshot_scene
+    continuous_snapshot = None
+    continuous_snapshot_scene = None
+
+
+def find_changed_sequences(scene, sequences):
+    """Compares the current sequence names against the snapshot taken on the last update
+    Arguments:
+        scene: the current Scene
+        sequences: collection of VSE Sequence objects to check
+
+    Returns: A set of names that were not present in the last snapshot.  If no snapshot exists yet, all names are returned."""
+
+    global continuous_snapshot
+    global continuous_snapshot_scene
+    current = set(sequences.keys())
+    if continuous_snapshot is None or continuous_snapshot_scene != scene.name:
+        added = current
+    else:
+        added = current - continuous_snapshot
+    continuous_snapshot = current
+    continuous_snapshot_scene = scene.name
+    return added
+
+
 @persistent
+@vseqf.instrument('vseqf_continuous')
 def vseqf_continuous(scene):
+    global default_keymap_replaced
     if not bpy.context.scene or bpy.context.scene != scene:
         return
-    replace_default_keymap()
+    if not default_keymap_replaced:
+        default_keymap_replaced = replace_default_keymap()
+    #strips may have been moved by anything, even when the frame was changed in the same update (ripple cuts and
+    #grabs, snap new end), so the timeline indexes will be rebuilt on the next query
+    timeline.invalidate_span_index()
+    timeline.invalidate_edge_index()
+    timeline.invalidate_marker_index()
+    fades.outdate_fade_curve_cache()
     if scene.vseqf.last_frame != scene.frame_current:
         #scene frame was changed, assume nothing else happened
         pass
@@ -683,29 +718,44 @@ def vseqf_continuous(scene):
             sequences = sequencer.sequences
         except:
             return
+        if sequencer.meta_stack:
+            #strips inside the meta strip being edited are not in the snapshot, so changes to them cannot be found
+            parenting.invalidate_index()
+            tags.invalidate_tag_index()
+        previous_snapshot = continuous_snapshot if continuous_snapshot_scene == scene.name else None
+        added = find_changed_sequences(scene, sequences)
+        if previous_snapshot is not None and len(previous_snapshot) + len(added) != len(continuous_snapshot):
+            #strips were deleted or renamed since the last update, remove the old names from the tag index
+            tags.index_remove_missing(previous_snapshot - continuous_snapshot)
+        if not added:
+            #no strips were added, duplicated or renamed since the last update
+            return
         new_sequences = []
         new_end = scene.frame_current
         build_proxies = False
-        for sequence in sequences:
+        for name in added:
+            sequence = sequences.get(name)
+            if sequence is None:
+                continue
+            tags.index_sequence_tags(sequence)
             if sequence.new:
                 if not (sequence.type == 'META' or hasattr(sequence, 'input_1')):
                     new_sequences.append(sequence)
                 sequence.last_name = sequence.name
                 sequence.new = False
+                parenting.index_sequence(sequence)
             if sequence.last_name != sequence.name:
                 #sequence was renamed or duplicated, update parenting if the original doesnt still exist
                 if sequence.name and sequence.last_name:
-                    original = False
-                    for seq in sequences:
-                        if seq.name == sequence.last_name:
-                            #this sequence was just duplicated or copied, dont do anything
-                            original = seq
-                            break
-                    if not original:
+                    if sequence.last_name not in continuous_snapshot:
                         #sequence was renamed, update parenting
+                        fades.invalidate_fade_curve_cache()
+                        parenting.index_rename(sequence.last_name, sequence.name)
                         children = parenting.find_children(sequence.last_name, name=True, sequences=sequences)
-                        for child in children:
-                            child.parent = sequence.name
+                        parenting.add_children(sequence, children)
+                    else:
+                        #this sequence was just duplicated or copied, the original still exists
+                        parenting.index_sequence(sequence)
                 sequence.last_name = sequence.name
         if new_sequences:
             for sequence in new_sequences:
@@ -717,7 +767,7 @@ def vseqf_continuous(scene):
                         for seq in new_sequences:
                             if seq.type == 'MOVIE':
                                 if seq.filepath == sequence.sound.filepath:
-                                    sequence.parent = seq.name
+                                    parenting.add_children(seq, [sequence])
                                     break
                 if vseqf.proxy():
                     #enable proxies on sequence
@@ -754,6 +804,7 @@ def vseqf_continuous(scene):
                 scene.frame_current = new_end
 
 
+@vseqf.instrument('vseqf_draw')
 def vseqf_draw():
     context = bpy.context
     prefs = vseqf.get_prefs()
@@ -780,23 +831,50 @@ def vseqf_draw():
     min_x = 25
     max_x = width - 10
     fps = vseqf.get_fps()
-    draw_strip_info(context, active_strip, fps, frame_px, channel_px, min_x, max_x, view, width, text_color, prefs.fades, prefs.parenting, True, True)
+    overlay = vseqf.OverlayBatch()
+
+    #only draw info for the active and selected strips that are at least partially visible, a strip fills the area from its channel to the channel above
+    if strip_visible(active_strip, left, right, bottom, top):
+        draw_strip_info(overlay, context, active_strip, fps, frame_px, channel_px, min_x, max_x, view, width, text_color, prefs.fades, prefs.parenting, True, True)
     selected = timeline.current_selected(context)
     for strip in selected:
-        if strip != active_strip:
-            draw_strip_info(context, strip, fps, frame_px, channel_px, min_x, max_x, view, width, text_color, prefs.fades, prefs.parenting, False, True)
+        if strip != active_strip and strip_visible(strip, left, right, bottom, top):
+            draw_strip_info(overlay, context, strip, fps, frame_px, channel_px, min_x, max_x, view, width, text_color, prefs.fades, prefs.parenting, False, True)
+    overlay.draw()
+
+
+def strip_visible(strip, left, right, bottom, top):
+    """Checks if any part of a strip is inside an area of the timeline
+    Arguments:
+        strip: VSE Sequence object to check
+        left: The leftmost frame of the area
+        right: The rightmost frame of the area
+        bottom: The lowest channel of the area
+        top: The topmost channel of the area
 
+    Returns: True if the strip is at least partially inside the area"""
 
-def draw_strip_info(context, active_strip, fps, frame_px, channel_px, min_x, max_x, view, width, text_color, show_fades, show_parenting, show_length, show_markers):
+    if strip.frame_final_start >= right or strip.frame_final_end <= left:
+        return False
+    if strip.channel + 1 <= bottom or strip.channel >= top:
+        return False
+    return True
+
+
+def draw_strip_info(overlay, context, active_strip, fps, frame_px, channel_px, min_x, max_x, view, width, text_color, show_fades, show_parenting, show_length, show_markers):
+    #Adds the overlay shapes for a single strip to the given vseqf.OverlayBatch
     length = active_strip.frame_final_duration
+    active_width = length * frame_px
+    text_size = 10
+    if active_width <= text_size * 6:
+        #strip is too narrow to show fade info, dont bother looking up the fade curve
+        show_fades = False
     active_x = active_strip.frame_final_start + (length / 2)
     active_y = active_strip.channel + 0.5
     active_left, active_top = view.view_to_region(active_strip.frame_final_start, active_strip.channel+1, clip=False)
     active_right, active_bottom = view.view_to_region(active_strip.frame_final_end, active_strip.channel, clip=False)
     active_pos_x, active_pos_y = view.view_to_region(active_x, active_strip.channel + 0.5, clip=False)
-    active_width = length * frame_px
     fade_height = channel_px / 20
-    text_size = 10
     strip_x = active_pos_x
     if strip_x <= min_x and active_right > min_x:
         strip_x = min_x
@@ -806,26 +884,24 @@ def draw_strip_info(context, active_strip, fps, frame_px, channel_px, min_x, max
     #display length
     if show_length:
         length_timecode = vseqf.timecode_from_frames(length, fps)
-        vseqf.draw_text(strip_x - (strip_x / width) * 40, active_bottom + (channel_px * .1), text_size, '('+length_timecode+')', text_color)
+        overlay.add_text(strip_x - (strip_x / width) * 40, active_bottom + (channel_px * .1), text_size, '('+length_timecode+')', text_color)
 
     #display fades
-    if show_fades and active_width > text_size * 6:
-        fade_curve = fades.get_fade_curve(context, active_strip, create=False)
-        if fade_curve:
-            fadein = int(fades.fades(fade_curve, active_strip, 'detect', 'in'))
-            if fadein and length:
-                fadein_percent = fadein / length
-                vseqf.draw_rect(active_left, active_top - (fade_height * 2), fadein_percent * active_width, fade_height, color=(.5, .5, 1, .75))
-                vseqf.draw_text(active_left, active_top, text_size, 'In: '+str(fadein), text_color)
-            fadeout = int(fades.fades(fade_curve, active_strip, 'detect', 'out'))
-            if fadeout and length:
-                fadeout_percent = fadeout / length
-                fadeout_width = active_width * fadeout_percent
-                vseqf.draw_rect(active_right - fadeout_width, active_top - (fade_height * 2), fadeout_width, fade_height, color=(.5, .5, 1, .75))
-                vseqf.draw_text(active_right - (text_size * 4), active_top, text_size, 'Out: '+str(fadeout), text_color)
+    if show_fades:
+        fadein, fadeout = fades.get_fade_lengths(active_strip, context)
+        fadein = int(fadein)
+        fadeout = int(fadeout)
+        if fadein and length:
+            fadein_percent = fadein / length
+            overlay.add_rect(active_left, active_top - (fade_height * 2), fadein_percent * active_width, fade_height, color=(.5, .5, 1, .75))
+            overlay.add_text(active_left, active_top, text_size, 'In: '+str(fadein), color=text_color)
+        if fadeout and length:
+            fadeout_percent = fadeout / length
+            fadeout_width = active_width * fadeout_percent
+            overlay.add_rect(active_right - fadeout_width, active_top - (fade_height * 2), fadeout_width, fade_height, color=(.5, .5, 1, .75))
+            overlay.add_text(active_right - (text_size * 4), active_top, text_size, 'Out: '+str(fadeout), color=text_color)
 
     if show_parenting:
-        bgl.glEnable(bgl.GL_BLEND)
         children = parenting.find_children(active_strip)
         parent = parenting.find_parent(active_strip)
         if parent:
@@ -837,8 +913,7 @@ def draw_strip_info(context, active_strip, fps, frame_px, channel_px, min_x, max
             pixel_y_distance = int(distance_y * channel_px)
             pixel_x = active_pos_x + pixel_x_distance
             pixel_y = active_pos_y + pixel_y_distance
-            vseqf.draw_line(strip_x, active_pos_y, pixel_x, pixel_y, color=(0.0, 0.0, 0.0, 0.2))
-        coords = []
+            overlay.add_line(strip_x, active_pos_y, pixel_x, pixel_y, color=(0.0, 0.0, 0.0, 0.2))
         for child in children:
             child_x = child.frame_final_start + (child.frame_final_duration / 2)
             child_y = child.channel + 0.5
@@ -848,17 +923,9 @@ def draw_strip_info(context, active_strip, fps, frame_px, channel_px, min_x, max
             pixel_y_distance = int(distance_y * channel_px)
             pixel_x = active_pos_x + pixel_x_distance
             pixel_y = active_pos_y + pixel_y_distance
-            coords.append((strip_x, active_pos_y))
-            coords.append((pixel_x, pixel_y))
-        shader = gpu.shader.from_builtin('2D_UNIFORM_COLOR')
-        batch = batch_for_shader(shader, 'LINES', {'pos': coords})
-        shader.bind()
-        shader.uniform_float('color', (1.0, 1.0, 1.0, 0.2))
-        batch.draw(shader)
-        bgl.glDisable(bgl.GL_BLEND)
+            overlay.add_line(strip_x, active_pos_y, pixel_x, pixel_y, color=(1.0, 1.0, 1.0, 0.2))
 
     if show_markers:
-        bgl.glEnable(bgl.GL_BLEND)
         for tag in active_strip.tags:
             if tag.use_offset:
                 if active_strip.frame_offset_start < tag.offset <= active_strip.frame_final_duration + active_strip.frame_offset_start - active_strip.frame_still_start:
@@ -867,14 +934,34 @@ def draw_strip_info(context, active_strip, fps, frame_px, channel_px, min_x, max
                     width = tag.length * frame_px
                     if left + width > active_right:
                         width = active_right - left
-                    bgl.glEnable(bgl.GL_BLEND)
-                    vseqf.draw_rect(left, active_bottom, width, channel_px, color=(tag.color[0], tag.color[1], tag.color[2], 0.33))
-                    vseqf.draw_text(left, active_top, text_size, tag.text)
-        bgl.glDisable(bgl.GL_BLEND)
+                    overlay.add_rect(left, active_bottom, width, channel_px, color=(tag.color[0], tag.color[1], tag.color[2], 0.33))
+                    overlay.add_text(left, active_top, text_size, tag.text)
+
+
+@persistent
+def vseqf_undo(scene):
+    """Handler that clears cached data after undo, redo or file load, since any stored strip information may be outdated"""
+    del scene
+    parenting.invalidate_index()
+    timeline.invalidate_span_index()
+    timeline.invalidate_neighbour_index()
+    timeline.invalidate_edge_index()
+    timeline.invalidate_marker_index()
+    tags.invalidate_tag_index()
+    fades.invalidate_fade_curve_cache()
+    reset_continuous_snapshot()
+
+
+@persistent
+def vseqf_load(scene):
+    """Handler that clears sound data after a file is loaded, since sounds in the new file may have the same names as the old ones"""
+    del scene
+    vu_meter.clear_sound_peaks()
 
 
 #Functions related to QuickSpeed
 @persistent
+@vseqf.instrument('frame_step')
 def frame_step(scene):
     """Handler that skips frames when the speed step value is used, and updates the vu meter
     Argument:
@@ -1080,6 +1167,10 @@ class VSEQFSetting(bpy.types.PropertyGroup):
     strip_tag_index: bpy.props.IntProperty(
         name="Strip Tag Display Index",
         default=0)
+    tag_query: bpy.props.StringProperty(
+        name="Tag Query",
+        default='',
+        description='Tags combined with AND, OR, NOT and parentheses, like: interview AND NOT rejected')
 
     quickcuts_insert: bpy.props.IntProperty(
         name="Frames To Insert",
@@ -1126,6 +1217,16 @@ class VSEQuickFunctionSettings(bpy.types.AddonPreferences):
     threepoint: bpy.props.BoolProperty(
         name="Enable Quick Three Point",
         default=True)
+    peak_cache_directory: bpy.props.StringProperty(
+        name="Audio Peak Cache Folder",
+        description="Folder to store audio peak files used by the VU meter and clipping check in.  If blank, a 'vseqf_peaks' folder next to the blend file will be used",
+        default='',
+        subtype='DIR_PATH')
+    peak_cache_size: bpy.props.IntProperty(
+        name="Audio Peak Cache Size (MB)",
+        description="Maximum size of the audio peak cache folder, the least recently used files are removed first",
+        default=256,
+        min=1)
 
     auto_check_update: bpy.props.BoolProperty(
         name="Auto-check for Update",
@@ -1165,6 +1266,8 @@ class VSEQuickFunctionSettings(bpy.types.AddonPreferences):
         layout.prop(self, "cuts")
         layout.prop(self, "edit")
         layout.prop(self, "threepoint")
+        layout.prop(self, "peak_cache_directory")
+        layout.prop(self, "peak_cache_size")
 
         mainrow = layout.row()
         col = mainrow.column()
@@ -1391,20 +1494,35 @@ def remove_continuous_handler(add=False):
         continuous_handler = handlers.append(vseqf_continuous)
 
 
+def remove_undo_handler(add=False):
+    handler_lists = [bpy.app.handlers.undo_post, bpy.app.handlers.redo_post, bpy.app.handlers.load_post]
+    for handlers in handler_lists:
+        if vseqf_undo in handlers:
+            handlers.remove(vseqf_undo)
+        if add:
+            handlers.append(vseqf_undo)
+    handlers = bpy.app.handlers.load_post
+    if vseqf_load in handlers:
+        handlers.remove(vseqf_load)
+    if add:
+        handlers.append(vseqf_load)
+
+
 #Register properties, operators, menus and shortcuts
 classes = classes + [VSEQFSettingsMenu, VSEQFSetting, VSEQFFollow, VSEQFImport, VSEQF_PT_CompactEdit,
                      SEQUENCER_MT_strip, SEQUENCER_MT_strip_transform, SEQUENCER_MT_add]
 
 
 def replace_default_keymap():
-    #replace sequencer select tool keymaps
+    #replace sequencer select tool keymaps, returns True once the keymap has been found and handled
     default_keymaps = bpy.context.window_manager.keyconfigs.default.keymaps
     if 'Sequencer Tool: Select' not in default_keymaps:
-        return
+        return False
     select_tool_keymap = default_keymaps['Sequencer Tool: Select']
     if 'sequencer.select' in select_tool_keymap.keymap_items:
         current_select = select_tool_keymap.keymap_items['sequencer.select']
         select_tool_keymap.keymap_items.remove(current_select)
+    return True
 
 
 def register_keymaps():
@@ -1553,6 +1671,9 @@ def register():
 
     #Register classes
     for cls in classes:
+        if issubclass(cls, bpy.types.Operator):
+            #record operator run times when profiling is enabled
+            vseqf.instrument_operator(cls)
         bpy.utils.register_class(cls)
 
     #Register toolbar buttons
@@ -1593,6 +1714,7 @@ def register():
     #Register handlers
     remove_frame_step_handler(add=True)
     remove_continuous_handler(add=True)
+    remove_undo_handler(add=True)
     remove_vu_draw_handler(add=True)
 
 
@@ -1620,6 +1742,8 @@ def unregister():
     remove_vu_draw_handler()
     remove_frame_step_handler()
     remove_continuous_handler()
+    remove_undo_handler()
+    vu_meter.stop_peak_building()
 
     try:
         bpy.utils.unregister_class(VSEQuickFunctionSettings)
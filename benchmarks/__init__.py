@@ -0,0 +1,2 @@
+"""Benchmarks for VSEQF that run outside of Blender, using the stand-in bpy modules in fake_bpy.
+See run.py for usage."""
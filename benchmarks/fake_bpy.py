@@ -0,0 +1,757 @@
+"""Lightweight stand-in for the parts of the Blender python api used by VSEQF, so the addon functions can be timed
+outside of Blender.  Only enough is implemented to run the benchmarked functions: sequences, markers, f-curves,
+keyframes, sound factories, and the few operators those functions call.  Strips never push each other out of the
+way like they do in Blender, so timings of functions that rely on that will be optimistic."""
+
+import sys
+import types
+import math
+import random
+import numpy
+
+
+class Anything(object):
+    #Stands in for modules and objects that are only used for drawing or interface, every call and attribute is allowed
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __call__(self, *args, **kwargs):
+        return Anything()
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return Anything()
+
+    def __iter__(self):
+        return iter([])
+
+    def __bool__(self):
+        return False
+
+
+class Property(object):
+    #Result of a bpy.props function, remembers the settings so a default value can be made later
+    def __init__(self, kind, args, kwargs):
+        self.kind = kind
+        self.args = args
+        self.kwargs = kwargs
+
+    def default_value(self):
+        default = self.kwargs.get('default')
+        if self.kind == 'CollectionProperty':
+            return Collection(item_type=self.kwargs.get('type'))
+        if self.kind == 'PointerProperty':
+            return make_property_group(self.kwargs.get('type'))
+        if self.kind == 'EnumProperty':
+            if default is not None:
+                return default
+            items = self.kwargs.get('items')
+            if items and not callable(items):
+                return items[0][0]
+            return ''
+        if default is not None:
+            return default
+        if self.kind == 'BoolProperty':
+            return False
+        if self.kind == 'IntProperty':
+            return 0
+        if self.kind == 'FloatProperty':
+            return 0.0
+        if self.kind == 'FloatVectorProperty':
+            return [0.0] * self.kwargs.get('size', 3)
+        return ''
+
+
+def make_property(kind):
+    def property_function(*args, **kwargs):
+        return Property(kind, args, kwargs)
+    return property_function
+
+
+def make_property_group(cls):
+    """Creates an instance of a PropertyGroup class with every property set to its default value
+    Arguments:
+        cls: a class with bpy.props annotations
+
+    Returns: an instance of cls"""
+
+    if cls is None:
+        return Anything()
+    group = cls()
+    set_property_defaults(group, cls)
+    return group
+
+
+def set_property_defaults(instance, cls):
+    #Sets every bpy.props annotation of cls to its default value on an instance
+    for klass in reversed(cls.__mro__):
+        for name, prop in getattr(klass, '__annotations__', {}).items():
+            if isinstance(prop, Property):
+                setattr(instance, name, prop.default_value())
+
+
+def make_operator(cls, **properties):
+    """Creates an operator instance the way Blender does, the properties are set before __init__ is called
+    Arguments:
+        cls: an Operator class
+        properties: property values to use instead of the defaults
+
+    Returns: an instance of cls"""
+
+    operator = cls.__new__(cls)
+    set_property_defaults(operator, cls)
+    for name, value in properties.items():
+        setattr(operator, name, value)
+    cls.__init__(operator)
+    return operator
+
+
+class Struct(object):
+    #Base for all stand-in bpy.types classes, also accepts the menu append functions used when registering
+    @classmethod
+    def append(cls, function):
+        pass
+
+    @classmethod
+    def prepend(cls, function):
+        pass
+
+    @classmethod
+    def remove(cls, function):
+        pass
+
+    def as_pointer(self):
+        return id(self)
+
+
+class Collection(object):
+    """Stand-in for bpy_prop_collection, items can be found by index or name"""
+
+    def __init__(self, items=(), item_type=None):
+        self.items_list = []
+        self.names = {}
+        self.item_type = item_type
+        for item in items:
+            self.link(item)
+
+    def link(self, item):
+        self.items_list.append(item)
+        name = getattr(item, 'name', None)
+        if name is not None:
+            self.names[name] = item
+        item_collection = getattr(item, 'collection', None)
+        if item_collection is None and hasattr(item, 'collection'):
+            item.collection = self
+        return item
+
+    def unlink(self, item):
+        self.items_list.remove(item)
+        name = getattr(item, 'name', None)
+        if name is not None and self.names.get(name) is item:
+            del self.names[name]
+
+    def renamed(self, item, old_name):
+        if self.names.get(old_name) is item:
+            del self.names[old_name]
+        self.names[item.name] = item
+
+    def unique_name(self, name):
+        if name not in self.names:
+            return name
+        index = 1
+        while name+'.'+str(index).zfill(3) in self.names:
+            index = index + 1
+        return name+'.'+str(index).zfill(3)
+
+    def __iter__(self):
+        return iter(list(self.items_list))
+
+    def __len__(self):
+        return len(self.items_list)
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self.names[key]
+        return self.items_list[key]
+
+    def __contains__(self, key):
+        if isinstance(key, str):
+            return key in self.names
+        return key in self.items_list
+
+    def get(self, name, default=None):
+        return self.names.get(name, default)
+
+    def keys(self):
+        return list(self.names.keys())
+
+    def values(self):
+        return list(self.items_list)
+
+    def items(self):
+        return list(self.names.items())
+
+    def find(self, name):
+        item = self.names.get(name)
+        if item is None:
+            #items made with add are not in the names dictionary
+            for index, item in enumerate(self.items_list):
+                if getattr(item, 'name', None) == name:
+                    return index
+            return -1
+        return self.items_list.index(item)
+
+    def foreach_get(self, attribute, values):
+        flat = []
+        for item in self.items_list:
+            value = getattr(item, attribute)
+            if isinstance(value, (list, tuple)):
+                flat.extend(value)
+            else:
+                flat.append(value)
+        values[:len(flat)] = flat
+
+    def foreach_set(self, attribute, values):
+        values = list(values)
+        if not self.items_list:
+            return
+        size = len(values) // len(self.items_list)
+        for index, item in enumerate(self.items_list):
+            if size == 1:
+                setattr(item, attribute, values[index])
+            else:
+                setattr(item, attribute, Vector(values[index * size:(index + 1) * size]))
+
+    def add(self):
+        #new item of a CollectionProperty, names are not tracked since they are usually set after adding
+        item = make_property_group(self.item_type)
+        self.items_list.append(item)
+        return item
+
+    def move(self, from_index, to_index):
+        self.items_list.insert(to_index, self.items_list.pop(from_index))
+
+    def remove(self, item):
+        #collection properties remove by index, other collections remove the item itself
+        if isinstance(item, int):
+            item = self.items_list[item]
+        self.unlink(item)
+
+    def clear(self):
+        self.items_list.clear()
+        self.names.clear()
+
+
+class Vector(list):
+    #Keyframe coordinates, a list so values can be read by index and converted with tuple()
+    pass
+
+
+class Keyframe(Struct):
+    def __init__(self, frame=0.0, value=0.0):
+        self.co = Vector([frame, value])
+        self.handle_left = Vector([frame, value])
+        self.handle_right = Vector([frame, value])
+        self.interpolation = 'BEZIER'
+        self.handle_left_type = 'AUTO_CLAMPED'
+        self.handle_right_type = 'AUTO_CLAMPED'
+        self.easing = 'AUTO'
+
+    def __setattr__(self, name, value):
+        if name in ('co', 'handle_left', 'handle_right'):
+            value = Vector(value)
+        object.__setattr__(self, name, value)
+
+
+class KeyframePoints(Collection):
+    def add(self, count=1):
+        for index in range(count):
+            self.link(Keyframe())
+
+    def insert(self, frame, value, options=set(), keyframe_type='KEYFRAME'):
+        for keyframe in self.items_list:
+            if keyframe.co[0] == frame:
+                keyframe.co = (frame, value)
+                return keyframe
+        keyframe = Keyframe(frame, value)
+        self.items_list.append(keyframe)
+        self.items_list.sort(key=lambda point: point.co[0])
+        return keyframe
+
+
+class FCurve(Struct):
+    def __init__(self, data_path, index=0, action_group=''):
+        self.data_path = data_path
+        self.array_index = index
+        self.keyframe_points = KeyframePoints()
+        self.modifiers = Collection()
+        self.extrapolation = 'CONSTANT'
+        self.group = None
+
+    def evaluate(self, frame):
+        #linear interpolation between keyframes is close enough for timing
+        points = self.keyframe_points.items_list
+        if not points:
+            return 0.0
+        if frame <= points[0].co[0]:
+            return points[0].co[1]
+        if frame >= points[-1].co[0]:
+            return points[-1].co[1]
+        for previous_point, point in zip(points, points[1:]):
+            if point.co[0] >= frame:
+                span = point.co[0] - previous_point.co[0]
+                if span == 0:
+                    return point.co[1]
+                factor = (frame - previous_point.co[0]) / span
+                return previous_point.co[1] + (point.co[1] - previous_point.co[1]) * factor
+        return points[-1].co[1]
+
+    def update(self):
+        self.keyframe_points.items_list.sort(key=lambda point: point.co[0])
+
+
+class FCurves(Collection):
+    def new(self, data_path, index=0, action_group=''):
+        curve = FCurve(data_path, index, action_group)
+        self.link(curve)
+        return curve
+
+    def find(self, data_path, index=0):
+        for curve in self.items_list:
+            if curve.data_path == data_path and curve.array_index == index:
+                return curve
+        return None
+
+
+class Action(Struct):
+    def __init__(self, name):
+        self.name = name
+        self.fcurves = FCurves()
+
+
+class AnimationData(Struct):
+    def __init__(self):
+        self.action = None
+
+
+class SoundFactory(object):
+    """Stand-in for aud.Sound, generates a sine wave that gets louder and quieter over time"""
+
+    def __init__(self, length, rate=48000, channels=2, start=0.0, end=None):
+        self.length = length
+        self.rate = rate
+        self.channels = channels
+        self.start = start
+        self.end = length if end is None else min(end, length)
+        self.specs = (rate, channels)
+
+    def limit(self, start, end):
+        return SoundFactory(self.length, self.rate, self.channels, self.start + max(start, 0), self.start + max(end, 0))
+
+    def data(self):
+        first = int(round(self.start * self.rate))
+        last = int(round(self.end * self.rate))
+        if last <= first:
+            return numpy.zeros((0, self.channels), dtype=numpy.float32)
+        times = numpy.arange(first, last) / self.rate
+        wave = numpy.sin(times * 440 * 2 * math.pi) * (0.5 + 0.5 * numpy.sin(times * 0.5))
+        return numpy.repeat(wave.reshape(-1, 1), self.channels, axis=1).astype(numpy.float32)
+
+
+class Sound(Struct):
+    def __init__(self, name, filepath, length):
+        self.name = name
+        self.filepath = filepath
+        self.factory = SoundFactory(length)
+
+    def evaluated_get(self, depsgraph):
+        return self
+
+
+class Sequence(Struct):
+    """Stand-in for a VSE strip.  Frame values follow the same rules as Blender: the final start and end are the
+    content start and end, moved in by the offsets."""
+
+    def __init__(self, name, sequence_type, channel, frame_start, length):
+        self.collection = None
+        self.name_value = name
+        self.type = sequence_type
+        self.channel = channel
+        self.frame_start = frame_start
+        self.frame_duration = length
+        self.frame_offset_start = 0
+        self.frame_offset_end = 0
+        self.frame_still_start = 0
+        self.frame_still_end = 0
+        self.select = False
+        self.select_left_handle = False
+        self.select_right_handle = False
+        self.lock = False
+        self.mute = False
+        self.blend_alpha = 1.0
+        self.blend_type = 'REPLACE'
+        self.color_tag = 'NONE'
+        self.modifiers = Collection()
+        #properties added by VSEQF when registering
+        self.parent = ''
+        self.tags = Collection()
+        self.new = False
+        self.last_name = name
+
+    @property
+    def name(self):
+        return self.name_value
+
+    @name.setter
+    def name(self, value):
+        old_name = self.name_value
+        if self.collection is not None:
+            value = self.collection.unique_name(value)
+        self.name_value = value
+        if self.collection is not None:
+            self.collection.renamed(self, old_name)
+
+    @property
+    def frame_final_start(self):
+        return self.frame_start + self.frame_offset_start
+
+    @frame_final_start.setter
+    def frame_final_start(self, value):
+        self.frame_offset_start = value - self.frame_start
+
+    @property
+    def frame_final_end(self):
+        return self.frame_start + self.frame_duration - self.frame_offset_end
+
+    @frame_final_end.setter
+    def frame_final_end(self, value):
+        self.frame_offset_end = self.frame_start + self.frame_duration - value
+
+    @property
+    def frame_final_duration(self):
+        return self.frame_final_end - self.frame_final_start
+
+    def path_from_id(self, prop=None):
+        path = 'sequence_editor.sequences_all["'+self.name+'"]'
+        if prop:
+            path = path+'.'+prop
+        return path
+
+    def copy(self, name):
+        new_sequence = self.__class__.__new__(self.__class__)
+        new_sequence.__dict__.update(self.__dict__)
+        new_sequence.collection = None
+        new_sequence.name_value = name
+        new_sequence.modifiers = Collection()
+        new_sequence.tags = Collection()
+        return new_sequence
+
+
+class MovieSequence(Sequence):
+    def __init__(self, name, channel, frame_start, length, filepath):
+        Sequence.__init__(self, name, 'MOVIE', channel, frame_start, length)
+        self.filepath = filepath
+
+
+class SoundSequence(Sequence):
+    def __init__(self, name, channel, frame_start, length, sound):
+        Sequence.__init__(self, name, 'SOUND', channel, frame_start, length)
+        self.sound = sound
+        self.volume = 1.0
+
+
+class EffectSequence(Sequence):
+    def __init__(self, name, sequence_type, channel, frame_start, length, input_1):
+        Sequence.__init__(self, name, sequence_type, channel, frame_start, length)
+        self.input_1 = input_1
+        self.input_count = 1
+
+
+class Sequences(Collection):
+    def new_effect(self, name, type, channel, frame_start, frame_end=0, seq1=None, seq2=None, seq3=None):
+        if seq1 is not None:
+            frame_start = seq1.frame_final_start
+            frame_end = seq1.frame_final_end
+        sequence = EffectSequence(self.unique_name(name), type, channel, frame_start, frame_end - frame_start, seq1)
+        if seq2 is not None:
+            sequence.input_2 = seq2
+            sequence.input_count = 2
+        self.link(sequence)
+        return sequence
+
+    def new_sound(self, name, filepath, channel, frame_start):
+        sound = Sound(name, filepath, 60)
+        sequence = SoundSequence(self.unique_name(name), channel, frame_start, 60 * 30, sound)
+        self.link(sequence)
+        return sequence
+
+    def new_movie(self, name, filepath, channel, frame_start):
+        sequence = MovieSequence(self.unique_name(name), channel, frame_start, 60 * 30, filepath)
+        self.link(sequence)
+        return sequence
+
+
+class SequenceEditor(Struct):
+    def __init__(self):
+        self.sequences = Sequences()
+        #there are no meta strips, so all sequences are in the top level
+        self.sequences_all = self.sequences
+        self.meta_stack = []
+        self.active_strip = None
+        self.overlay_frame = 0
+
+
+class TimelineMarker(Struct):
+    def __init__(self, name, frame):
+        self.name = name
+        self.frame = frame
+        self.select = False
+
+
+class TimelineMarkers(Collection):
+    def new(self, name, frame=1):
+        marker = TimelineMarker(name, frame)
+        self.items_list.append(marker)
+        return marker
+
+
+class Render(Struct):
+    def __init__(self):
+        self.fps = 30
+        self.fps_base = 1.0
+
+
+class Scene(Struct):
+    def __init__(self, name='Scene'):
+        self.name = name
+        self.frame_current = 1
+        self.frame_start = 1
+        self.frame_end = 250
+        self.render = Render()
+        self.timeline_markers = TimelineMarkers()
+        self.sequence_editor = SequenceEditor()
+        self.animation_data = None
+        self.vseqf = Anything()
+
+    def animation_data_create(self):
+        self.animation_data = AnimationData()
+        return self.animation_data
+
+
+class Context(Struct):
+    """Stand-in for bpy.context, the sequence lists are built each time they are accessed, like in Blender"""
+
+    def __init__(self):
+        self.scene = Scene()
+        self.preferences = types.SimpleNamespace(addons={}, inputs=types.SimpleNamespace(use_drag_immediately=False))
+        self.window_manager = Anything()
+        self.window = Anything()
+        self.screen = types.SimpleNamespace(areas=[], is_animation_playing=False)
+        self.area = None
+        self.region = None
+
+    @property
+    def sequences(self):
+        if self.scene.sequence_editor is None:
+            return []
+        return list(self.scene.sequence_editor.sequences)
+
+    @property
+    def selected_sequences(self):
+        return [sequence for sequence in self.sequences if sequence.select]
+
+    def evaluated_depsgraph_get(self):
+        return None
+
+    def copy(self):
+        return {}
+
+
+class OperatorCategory(object):
+    #A group of operators like bpy.ops.sequencer, operators without a stand-in do nothing
+    def __init__(self, name, operators):
+        self.name = name
+        self.operators = operators
+
+    def __getattr__(self, name):
+        operator = self.operators.get(name)
+        if operator is None:
+            def operator(*args, **kwargs):
+                return {'FINISHED'}
+        return operator
+
+
+def sequencer_select_all(action='TOGGLE'):
+    for sequence in bpy.context.scene.sequence_editor.sequences:
+        if action == 'DESELECT':
+            sequence.select = False
+        elif action == 'SELECT':
+            sequence.select = True
+    return {'FINISHED'}
+
+
+def sequencer_split(frame=0, type='SOFT', side='BOTH', **kwargs):
+    #splits the selected strips, both sides are left selected
+    sequences = bpy.context.scene.sequence_editor.sequences
+    for sequence in [sequence for sequence in sequences if sequence.select]:
+        if sequence.frame_final_start < frame < sequence.frame_final_end:
+            right = sequence.copy(sequences.unique_name(sequence.name))
+            sequences.link(right)
+            right.frame_final_start = frame
+            sequence.frame_final_end = frame
+            right.select = True
+    return {'FINISHED'}
+
+
+def module(name, **attributes):
+    new_module = types.ModuleType(name)
+    for key, value in attributes.items():
+        setattr(new_module, key, value)
+    return new_module
+
+
+class TypesModule(types.ModuleType):
+    #bpy.types, any type that is not defined here is created as an empty class the first time it is used
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        new_type = type(name, (Struct, ), {})
+        setattr(self, name, new_type)
+        return new_type
+
+
+def persistent(function):
+    return function
+
+
+class Timers(object):
+    #Timers are stored but never run, the benchmarks run timer functions directly when needed
+    def __init__(self):
+        self.registered = []
+
+    def register(self, function, first_interval=0, persistent=False):
+        if function not in self.registered:
+            self.registered.append(function)
+
+    def unregister(self, function):
+        if function in self.registered:
+            self.registered.remove(function)
+
+    def is_registered(self, function):
+        return function in self.registered
+
+
+bpy = None
+
+
+def install():
+    """Puts the stand-in modules into sys.modules so the addon can be imported, does nothing if already installed
+    Returns: the stand-in bpy module"""
+
+    global bpy
+    if bpy is not None:
+        return bpy
+    bpy_types = TypesModule('bpy.types')
+    for name in ('Sequence', 'Scene', 'ID', 'MovieClip', 'Panel', 'Menu', 'PropertyGroup', 'UIList', 'AddonPreferences', 'WorkSpaceTool'):
+        setattr(bpy_types, name, type(name, (Struct, ), {}))
+    #operators are run by calling execute on an instance made with make_property_group, reports are ignored
+    bpy_types.Operator = type('Operator', (Struct, ), {'report': lambda self, report_type, message: None})
+    bpy_types.UI_UL_list = type('UI_UL_list', (Struct, ), {'filter_items_by_name': staticmethod(lambda *args, **kwargs: [])})
+    props = module('bpy.props')
+    for kind in ('BoolProperty', 'IntProperty', 'FloatProperty', 'StringProperty', 'EnumProperty', 'CollectionProperty', 'PointerProperty', 'FloatVectorProperty', 'IntVectorProperty', 'BoolVectorProperty'):
+        setattr(props, kind, make_property(kind))
+    handlers = module('bpy.app.handlers', persistent=persistent, depsgraph_update_post=[], frame_change_post=[], undo_post=[], redo_post=[], load_post=[])
+    app = module('bpy.app', handlers=handlers, timers=Timers(), version=(3, 1, 0), binary_path='', version_string='3.1.0')
+    operators = {
+        'sequencer': OperatorCategory('sequencer', {'select_all': sequencer_select_all, 'split': sequencer_split, 'cut': sequencer_split}),
+    }
+    ops = module('bpy.ops')
+    for category in ('sequencer', 'ed', 'screen', 'wm', 'vseqf', 'view', 'transform', 'scene', 'marker', 'view2d', 'anim'):
+        setattr(ops, category, operators.get(category, OperatorCategory(category, {})))
+    path = module('bpy.path', abspath=lambda filepath, **kwargs: filepath, extensions_movie=set(), basename=lambda filepath: filepath.split('/')[-1])
+    data = module('bpy.data', filepath='', texts=Collection(), actions=Anything(), movieclips=Collection(), scenes=Collection())
+    data.actions = types.SimpleNamespace(new=lambda name: Action(name))
+    utils = module('bpy.utils', register_class=lambda cls: None, unregister_class=lambda cls: None, register_tool=lambda *args, **kwargs: None, unregister_tool=lambda *args, **kwargs: None, refresh_script_paths=lambda: None, user_resource=lambda *args, **kwargs: '')
+    bpy = module('bpy', types=bpy_types, props=props, app=app, ops=ops, path=path, data=data, utils=utils, context=Context())
+
+    sys.modules['bpy'] = bpy
+    sys.modules['bpy.types'] = bpy_types
+    sys.modules['bpy.props'] = props
+    sys.modules['bpy.app'] = app
+    sys.modules['bpy.app.handlers'] = handlers
+    sys.modules['bpy.ops'] = ops
+    sys.modules['bpy.path'] = path
+    sys.modules['bpy.utils'] = utils
+    for name in ('bgl', 'blf', 'gpu', 'gpu_extras', 'mathutils'):
+        sys.modules[name] = Anything()
+    sys.modules['gpu_extras.batch'] = module('gpu_extras.batch', batch_for_shader=Anything())
+    sys.modules['bpy_extras'] = module('bpy_extras')
+    sys.modules['bpy_extras.io_utils'] = module('bpy_extras.io_utils', ImportHelper=type('ImportHelper', (object, ), {}))
+    sys.modules['addon_utils'] = module('addon_utils', modules=lambda *args, **kwargs: [], paths=lambda: [])
+    sys.modules['aud'] = module('aud', Sound=SoundFactory)
+    return bpy
+
+
+def build_timeline(scene, count, channels=8, seed=0, parented=True, faded=0.5, markers=0.1):
+    """Fills a scene with a synthetic timeline of strips.  Odd channels get movie strips, even channels get sound strips
+    that are children of the movie strip below them, like an imported video with audio.
+    Arguments:
+        scene: Scene to fill, any existing strips are removed
+        count: Integer, number of strips to add
+        channels: Integer, number of channels to spread the strips over
+        seed: Integer, random seed, the same seed always gives the same timeline
+        parented: Boolean, if True sound strips are made children of the movie strips
+        faded: Float, portion of strips that are given a fade in and fade out curve
+        markers: Float, number of timeline markers to add for each strip
+
+    Returns: the list of strips that were added"""
+
+    generator = random.Random(seed)
+    editor = scene.sequence_editor
+    editor.sequences.clear()
+    editor.active_strip = None
+    scene.timeline_markers.clear()
+    scene.animation_data = None
+    pairs = max(channels // 2, 1)
+    positions = [1] * pairs
+    added = []
+    index = 0
+    while index < count:
+        pair = index // 2 % pairs
+        length = generator.randint(24, 240)
+        start = positions[pair] + generator.randint(0, 48)
+        positions[pair] = start + length
+        movie = MovieSequence('Movie '+str(index), pair * 2 + 1, start, length, '/media/clip'+str(index)+'.mp4')
+        editor.sequences.link(movie)
+        added.append(movie)
+        index = index + 1
+        if index >= count:
+            break
+        sound = Sound('Sound '+str(index), '/media/clip'+str(index - 1)+'.mp4', length / scene.render.fps + 1)
+        audio = SoundSequence('Audio '+str(index), pair * 2 + 2, start, length, sound)
+        editor.sequences.link(audio)
+        added.append(audio)
+        if parented:
+            audio.parent = movie.name
+        index = index + 1
+
+    if faded:
+        scene.animation_data_create()
+        action = Action('Scene Action')
+        scene.animation_data.action = action
+        for sequence in added:
+            if generator.random() < faded:
+                fade_variable = 'volume' if sequence.type == 'SOUND' else 'blend_alpha'
+                curve = action.fcurves.new(sequence.path_from_id(fade_variable))
+                fade = min(12, sequence.frame_final_duration // 4)
+                curve.keyframe_points.insert(sequence.frame_final_start, 0)
+                curve.keyframe_points.insert(sequence.frame_final_start + fade, 1)
+                curve.keyframe_points.insert(sequence.frame_final_end - fade, 1)
+                curve.keyframe_points.insert(sequence.frame_final_end, 0)
+
+    end = max(positions)
+    for marker_index in range(int(count * markers)):
+        scene.timeline_markers.new('Marker '+str(marker_index), frame=generator.randint(1, end))
+    scene.frame_end = end
+    return added
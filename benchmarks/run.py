@@ -0,0 +1,300 @@
+"""Times VSEQF functions on synthetic timelines and writes the results as JSON.
+
+Usage, from the addon folder:
+    python -m benchmarks.run
+    python -m benchmarks.run --sizes 100 1000 --repeat 3 --only cut grab_move --output results.json
+    python -m benchmarks.run --addon /path/to/older/checkout --output old.json
+
+Each result gives the best, mean and median time in seconds of one run of a benchmark, on a timeline with the given
+number of strips.  Compare results from different versions with the same sizes and repeat count.  Benchmarks call the
+same operators and functions in every version, functions that only exist in newer versions are used when they are
+found, so an older checkout can be timed by passing its folder with --addon."""
+
+import os
+import sys
+import gc
+import json
+import time
+import argparse
+import platform
+import importlib.util
+import numpy
+from . import fake_bpy
+
+
+addon_name = 'vseqf_benchmark_addon'
+default_sizes = [100, 1000, 10000, 50000]
+
+
+def load_addon(addon_folder=None):
+    #Imports the addon as a package, with the stand-in bpy modules installed
+    bpy = fake_bpy.install()
+    if addon_name in sys.modules:
+        return sys.modules[addon_name], bpy
+    if addon_folder is None:
+        addon_folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    spec = importlib.util.spec_from_file_location(addon_name, os.path.join(addon_folder, '__init__.py'), submodule_search_locations=[addon_folder])
+    addon = importlib.util.module_from_spec(spec)
+    sys.modules[addon_name] = addon
+    spec.loader.exec_module(addon)
+    addon.default_keymap_replaced = True
+    bpy.context.scene.vseqf = fake_bpy.make_property_group(addon.VSEQFSetting)
+    return addon, bpy
+
+
+def call_if_found(owner, name, *args):
+    #Calls a function that may not exist in the version being timed
+    function = getattr(owner, name, None)
+    if function is not None:
+        return function(*args)
+    return None
+
+
+def reset_caches(addon):
+    #Clears all cached timeline data, the same as after an undo
+    call_if_found(addon, 'vseqf_undo', None)
+    sound_peaks = getattr(addon.vu_meter, 'sound_peaks', None)
+    if sound_peaks is not None:
+        sound_peaks.clear()
+    call_if_found(addon.vu_meter, 'stop_peak_building')
+
+
+def new_timeline(addon, bpy, size):
+    scene = bpy.context.scene
+    strips = fake_bpy.build_timeline(scene, size)
+    scene.frame_current = scene.frame_end // 2
+    scene.vseqf.last_frame = scene.frame_current
+    reset_caches(addon)
+    return scene, strips
+
+
+def grab_starting_data(addon, bpy, grabbed):
+    #Stores the starting data the same way a grab does in this version
+    grabs = addon.grabs
+    if hasattr(grabs, 'grab_scope'):
+        return grabs.grab_starting_data(grabs.grab_scope(grabbed))
+    #older versions store every strip
+    return grabs.grab_starting_data(addon.timeline.current_sequences(bpy.context))
+
+
+#Benchmarks, each is given the addon, bpy, and the timeline size.  Each returns a function to time, and optionally a
+#setup function that is run before every timed call.
+def benchmark_continuous(addon, bpy, size):
+    #the continuous handler after a change that did not add any strips
+    scene, strips = new_timeline(addon, bpy, size)
+    addon.vseqf_continuous(scene)
+
+    def run():
+        addon.vseqf_continuous(scene)
+    return run, None
+
+
+def benchmark_find_children(addon, bpy, size):
+    #finding the children of every parent strip
+    scene, strips = new_timeline(addon, bpy, size)
+    parents = [strip for strip in strips if strip.type == 'MOVIE']
+    call_if_found(addon.parenting, 'ensure_index')
+
+    def run():
+        for parent in parents:
+            addon.parenting.find_children(parent)
+    return run, None
+
+
+def benchmark_sequencer_area_filled(addon, bpy, size):
+    #1000 area queries spread over the timeline, including building the span index
+    scene, strips = new_timeline(addon, bpy, size)
+    end = scene.frame_end
+    queries = [(frame, frame + 100, channel) for frame, channel in zip(range(1, end, max(end // 1000, 1)), range(1000))]
+
+    def setup():
+        call_if_found(addon.timeline, 'invalidate_span_index')
+
+    def run():
+        for left, right, channel in queries:
+            addon.timeline.sequencer_area_filled(left, right, channel % 8 + 1, channel % 8 + 1, [])
+    return run, setup
+
+
+def benchmark_grab_move(addon, bpy, size):
+    #one update of a grab of 10 strips and their children, with the starting data already stored
+    scene, strips = new_timeline(addon, bpy, size)
+    context = bpy.context
+    grabbed = [strip for strip in strips if strip.type == 'MOVIE'][::max(size // 20, 1)][:10]
+    for strip in grabbed:
+        strip.select = True
+    starting_data = grab_starting_data(addon, bpy, grabbed)
+    offsets = [0]
+
+    def run():
+        offsets[0] = offsets[0] + 1
+        addon.grabs.move_sequences(context, starting_data, offsets[0] % 50, 0, grabbed)
+    return run, None
+
+
+def benchmark_grab_start(addon, bpy, size):
+    #storing the starting data of a grab of 10 strips and their children
+    scene, strips = new_timeline(addon, bpy, size)
+    grabbed = [strip for strip in strips if strip.type == 'MOVIE'][::max(size // 20, 1)][:10]
+
+    def run():
+        starting_data = grab_starting_data(addon, bpy, grabbed)
+        call_if_found(addon.grabs, 'build_move_plan', bpy.context, starting_data, grabbed)
+    return run, None
+
+
+def benchmark_cut(addon, bpy, size):
+    #cutting all strips at 10 frames with the cut operator, one cut per frame like pressing the cut key, the timeline
+    #is rebuilt before every run
+    state = {}
+
+    def setup():
+        scene, strips = new_timeline(addon, bpy, size)
+        end = scene.frame_end
+        state['frames'] = [end * index // 11 for index in range(1, 11)]
+
+    def run():
+        for frame in state['frames']:
+            operator = fake_bpy.make_operator(addon.cuts.VSEQFCut, frame=frame, use_frame=True, type='SOFT', all=True, use_all=True)
+            operator.execute(bpy.context)
+    return run, setup
+
+
+def benchmark_fade_detection(addon, bpy, size):
+    #detecting the fade lengths of every strip, without using stored lengths
+    scene, strips = new_timeline(addon, bpy, size)
+    context = bpy.context
+    fades = addon.fades
+
+    def setup():
+        #older versions stored detected lengths
+        call_if_found(fades, 'clear_fade_length_cache')
+
+    def run():
+        for strip in strips:
+            if hasattr(fades, 'get_fade_lengths'):
+                fades.get_fade_lengths(strip, context)
+            else:
+                fade_curve = fades.get_fade_curve(context, strip, create=False)
+                if fade_curve:
+                    fades.fades(fade_curve, strip, 'detect', 'in')
+                    fades.fades(fade_curve, strip, 'detect', 'out')
+    return run, setup
+
+
+def benchmark_vu(addon, bpy, size):
+    #the vu meter level on 100 frames, with peak tables already built if this version uses them
+    scene, strips = new_timeline(addon, bpy, size)
+    end = scene.frame_end
+    frames = list(range(1, end, max(end // 100, 1)))[:100]
+    addon.vu_meter.get_volume_unit(frames[0])
+    for frame in frames:
+        addon.vu_meter.get_volume_unit(frame)
+    if hasattr(addon.vu_meter, 'build_sound_peaks'):
+        while addon.vu_meter.build_sound_peaks() is not None:
+            pass
+
+    def run():
+        for frame in frames:
+            addon.vu_meter.get_volume_unit(frame)
+    return run, None
+
+
+def benchmark_tag_select(addon, bpy, size):
+    #selecting the strips with one tag with the select operator, which also refreshes the list of all tags, with one
+    #strip in 100 tagged
+    scene, strips = new_timeline(addon, bpy, size)
+    for index, strip in enumerate(strips[::100]):
+        tag = fake_bpy.make_property_group(addon.tags.VSEQFTags)
+        tag.text = 'Tag '+str(index % 10)
+        strip.tags.link(tag)
+    #the tags panel and menu only show with an active strip
+    scene.sequence_editor.active_strip = strips[0]
+    call_if_found(addon.tags, 'ensure_tag_index')
+
+    def run():
+        operator = fake_bpy.make_operator(addon.tags.VSEQFQuickTagsSelect, text='Tag 1')
+        operator.execute(bpy.context)
+    return run, None
+
+
+benchmarks = {
+    'continuous': benchmark_continuous,
+    'find_children': benchmark_find_children,
+    'sequencer_area_filled': benchmark_sequencer_area_filled,
+    'grab_start': benchmark_grab_start,
+    'grab_move': benchmark_grab_move,
+    'cut': benchmark_cut,
+    'fade_detection': benchmark_fade_detection,
+    'vu': benchmark_vu,
+    'tag_select': benchmark_tag_select,
+}
+
+
+def measure(run, setup, repeat):
+    times = []
+    for index in range(repeat):
+        if setup is not None:
+            setup()
+        gc.collect()
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return {
+        'best': times[0],
+        'mean': sum(times) / len(times),
+        'median': times[len(times) // 2],
+    }
+
+
+def run_benchmarks(names, sizes, repeat, addon_folder=None):
+    """Runs benchmarks on each timeline size
+    Arguments:
+        names: list of benchmark names, see 'benchmarks'
+        sizes: list of integer strip counts
+        repeat: number of times each benchmark is timed
+        addon_folder: folder of the addon version to time, the folder containing this benchmark is used if not given
+
+    Returns: A dictionary of results, ready to be saved as JSON"""
+
+    addon, bpy = load_addon(addon_folder)
+    results = []
+    for size in sizes:
+        for name in names:
+            run, setup = benchmarks[name](addon, bpy, size)
+            timing = measure(run, setup, repeat)
+            result = {'benchmark': name, 'strips': size, 'repeat': repeat}
+            result.update(timing)
+            results.append(result)
+            print(name+' '+str(size)+': '+str(round(timing['best'] * 1000, 3))+' ms', file=sys.stderr)
+    return {
+        'version': '.'.join(str(part) for part in addon.bl_info['version']),
+        'addon': os.path.dirname(os.path.abspath(addon.__file__)),
+        'python': platform.python_version(),
+        'numpy': numpy.__version__,
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': results,
+    }
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description='Times VSEQF functions on synthetic timelines')
+    parser.add_argument('--sizes', type=int, nargs='+', default=default_sizes, help='numbers of strips to test with')
+    parser.add_argument('--repeat', type=int, default=5, help='times to run each benchmark')
+    parser.add_argument('--only', nargs='+', choices=sorted(benchmarks.keys()), help='benchmarks to run, all are run if not given')
+    parser.add_argument('--output', help='file to save the JSON results to, printed if not given')
+    parser.add_argument('--addon', help='folder of another version of the addon to time, like an older checkout')
+    options = parser.parse_args(arguments)
+    names = options.only if options.only else list(benchmarks.keys())
+    report = run_benchmarks(names, options.sizes, options.repeat, addon_folder=options.addon)
+    text = json.dumps(report, indent=2)
+    if options.output:
+        with open(options.output, 'w') as file:
+            file.write(text)
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
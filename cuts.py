@@ -1,17 +1,21 @@
 import bpy
+import time
+from bisect import bisect_left, bisect_right
 from . import parenting
 from . import timeline
 from . import grabs
 from . import vseqf
 
 
-def vseqf_cut(sequence, frame=0, cut_type="SOFT"):
+def vseqf_cut(sequence, frame=0, cut_type="SOFT", deselect=True):
     #Check parenting settings, remove if parent strip doesnt exist (prevents cut strips from getting false parents)
     parent = parenting.find_parent(sequence)
     if not parent:
-        sequence.parent = ''
+        parenting.clear_parent(sequence)
 
-    bpy.ops.sequencer.select_all(action='DESELECT')
+    if deselect:
+        #can be skipped if the caller knows that no strips are selected
+        bpy.ops.sequencer.select_all(action='DESELECT')
     left_sequence = False
     right_sequence = False
     if frame > sequence.frame_final_start and frame < sequence.frame_final_end:
@@ -23,6 +27,8 @@ def vseqf_cut(sequence, frame=0, cut_type="SOFT"):
         sequences = timeline.current_selected(bpy.context)
         for seq in sequences:
             seq.select = False
+            #the new strip copies the parent property of the original, make sure the index knows about it
+            parenting.index_sequence(seq)
             if seq.frame_final_start < frame:
                 left_sequence = seq
             else:
@@ -35,6 +41,122 @@ def vseqf_cut(sequence, frame=0, cut_type="SOFT"):
     return left_sequence, right_sequence
 
 
+def fix_cut_parenting(cut_pairs):
+    #moves children of cut strips to the right side of the cut if they start after the cut
+    for cut_pair in cut_pairs:
+        left, right = cut_pair
+        if right and left:
+            children = parenting.find_children(left)
+            for child in children:
+                if child.frame_final_start >= right.frame_final_start:
+                    parenting.add_children(right, [child])
+
+
+def batch_cut(context, frames, cut_type='SOFT', cut_all=True):
+    """Cuts strips at a list of frames all at once.  The strips are walked in order of their start frame, and each strip
+    is only cut at the frames that fall inside it, so each strip and frame is only checked once.
+    Arguments:
+        context: the current context
+        frames: list of integer frame numbers to cut at
+        cut_type: String, 'SOFT' or 'HARD'
+        cut_all: Boolean, if True all unlocked strips will be cut, if False only selected strips and their children
+
+    Returns: A list of [left, right] VSE Sequence object pairs, one for each cut that was made"""
+
+    frames = sorted(set(frames))
+    sequences = timeline.current_sequences(context)
+    to_cut = []
+    if cut_all:
+        to_cut = [sequence for sequence in sequences if not sequence.lock and not hasattr(sequence, 'input_1')]
+    else:
+        selected = [sequence for sequence in sequences if sequence.select]
+        if vseqf.parenting():
+            #find all children in one pass instead of once per selected strip
+            selected = grabs.grab_scope(selected)
+        to_cut = [sequence for sequence in selected if not sequence.lock and not hasattr(sequence, 'input_1')]
+    to_cut.sort(key=lambda x: x.frame_final_start)
+
+    cut_pairs = []
+    if not frames or not to_cut:
+        return cut_pairs
+    active = timeline.current_active(context)
+    old_selects = timeline.deselect_sequences(sequences)
+    for sequence in to_cut:
+        #only frames strictly inside the strip can cut it
+        first = bisect_right(frames, sequence.frame_final_start)
+        last = bisect_left(frames, sequence.frame_final_end)
+        for frame in frames[first:last]:
+            left, right = vseqf_cut(sequence=sequence, frame=frame, cut_type=cut_type, deselect=False)
+            if not right:
+                break
+            cut_pairs.append([left, right])
+            if sequence == active and left:
+                active = left
+            #the rest of the frames cut the right side of this cut
+            sequence = right
+    timeline.invalidate_span_index()
+    timeline.fix_effects(cut_pairs, timeline.current_sequences(context))
+    fix_cut_parenting(cut_pairs)
+    for sequence in old_selects:
+        sequence.select = True
+    for left, right in cut_pairs:
+        if left.select:
+            right.select = True
+    if active:
+        context.scene.sequence_editor.active_strip = active
+    return cut_pairs
+
+
+class VSEQFBatchCut(bpy.types.Operator):
+    """Cuts strips at many frames at once, at every marker or at a list of frames and timecodes
+    Operator variables:
+        source: where the cut frames come from:
+            MARKERS: cut at every timeline marker
+            LIST: cut at the frames given in 'frames'
+        frames: comma separated list of frame numbers or HH:MM:SS:FF timecodes
+        type: SOFT or HARD cut
+        all: if True, cut all strips, if False, cut selected strips and their children"""
+
+    bl_idname = 'vseqf.batch_cut'
+    bl_label = 'Batch Cut'
+    bl_description = 'Cut strips at every marker or at a list of frames'
+    bl_options = {'REGISTER'}
+
+    source: bpy.props.EnumProperty(name='Cut At', items=[("MARKERS", "Markers", "", 1), ("LIST", "Frame List", "", 2)], default='MARKERS')
+    frames: bpy.props.StringProperty(name='Frames', description='Comma separated list of frames or HH:MM:SS:FF timecodes', default='')
+    type: bpy.props.EnumProperty(name='Type', items=[("SOFT", "Soft", "", 1), ("HARD", "Hard", "", 2)], default='SOFT')
+    all: bpy.props.BoolProperty(name='Cut All', default=True)
+
+    def get_frames(self, context):
+        if self.source == 'MARKERS':
+            return [marker.frame for marker in context.scene.timeline_markers]
+        fps = vseqf.get_fps(context.scene)
+        frames = []
+        for text in self.frames.split(','):
+            if not text.strip():
+                continue
+            frame = vseqf.frames_from_timecode(text, fps)
+            if frame is None:
+                self.report({'WARNING'}, 'Could not read frame: '+text)
+                continue
+            frames.append(frame)
+        return frames
+
+    def execute(self, context):
+        if not context.scene.sequence_editor:
+            return {'CANCELLED'}
+        frames = self.get_frames(context)
+        if not frames:
+            self.report({'WARNING'}, 'No Frames To Cut At')
+            return {'CANCELLED'}
+        bpy.ops.ed.undo_push()
+        start_time = time.perf_counter()
+        cut_pairs = batch_cut(context, frames, cut_type=self.type, cut_all=self.all)
+        elapsed = time.perf_counter() - start_time
+        self.report({'INFO'}, 'Made '+str(len(cut_pairs))+' cuts at '+str(len(set(frames)))+' frames in '+str(round(elapsed, 3))+' seconds')
+        return {'FINISHED'}
+
+
 class VSEQFCut(bpy.types.Operator):
     """Advanced cut operator with many extra operations.
     Operator variables:
@@ -188,6 +310,8 @@ class VSEQFCut(bpy.types.Operator):
                             newstart = merge_to.frame_final_start
                             self.delete_sequence(merge_to)
                             sequence.frame_final_start = newstart
+                        timeline.invalidate_span_index()
+        timeline.invalidate_neighbour_index()
         self.reset()
         return{'FINISHED'}
 
@@ -230,8 +354,8 @@ class VSEQFCut(bpy.types.Operator):
 
         #determine all sequences available to cut
         to_cut_temp = []
-        for sequence in sequences:
-            if not sequence.lock and timeline.under_cursor(sequence, self.frame) and not hasattr(sequence, 'input_1'):
+        for sequence in timeline.sequences_under_frame(self.frame):
+            if not sequence.lock and not hasattr(sequence, 'input_1'):
                 if self.all:
                     to_cut.append(sequence)
                     to_cut_temp.append(sequence)
@@ -301,15 +425,11 @@ class VSEQFCut(bpy.types.Operator):
                 to_select.append(right)
                 if active and left == active and side != 'BOTH':
                     to_active = right
+        #strips were split, trimmed or slid
+        timeline.invalidate_span_index()
         timeline.fix_effects(cut_pairs, sequences)
         #fix parenting of cut sequences
-        for cut_pair in cut_pairs:
-            left, right = cut_pair
-            if right and left:
-                children = parenting.find_children(left)
-                for child in children:
-                    if child.frame_final_start >= right.frame_final_start:
-                        child.parent = right.name
+        fix_cut_parenting(cut_pairs)
 
         #ripple/insert
         if self.type == 'INSERT' or self.type == 'RIPPLE' or self.type == 'INSERT_ONLY':
@@ -404,6 +524,10 @@ class VSEQFQuickCutsMenu(bpy.types.Menu):
         props.type = 'UNCUT_RIGHT'
         props.tooltip = 'Merge selected sequences to those on right if they match source and position'
         layout.separator()
+        props = layout.operator('vseqf.batch_cut', text='Cut At All Markers')
+        props.source = 'MARKERS'
+        props.all = quickcuts_all
+        layout.separator()
         layout.prop(context.scene.vseqf, 'quickcuts_all', toggle=True)
         layout.prop(context.scene.vseqf, 'quickcuts_insert')
         layout.menu("VSEQF_MT_quicktimeline_menu")
@@ -7,6 +7,14 @@ from . import vseqf
 from . import timeline
 
 
+#Cache of the curves in the scene action, data_path: index of the curve in action.fcurves.
+#Indexes are stored instead of the curves themselves so a stale cache can never point to a removed curve.
+fade_curve_cache = {}
+fade_curve_cache_key = None
+#True if the cache was built since the last change to the scene, so a missing curve really does not exist
+fade_curve_cache_current = False
+
+
 def fix_fades(context, sequence, old_start, old_end):
     fix_fade_in(context, sequence, old_start)
     fix_fade_out(context, sequence, old_end)
@@ -53,6 +61,65 @@ def vseqf_crossfade(first_sequence, second_sequence):
     while timeline.sequencer_area_filled(frame_start, frame_end, channel, channel, []):
         channel = channel + 1
     bpy.context.scene.sequence_editor.sequences.new_effect(name=transition_type, type=transition_type, channel=channel,  frame_start=frame_start, frame_end=frame_end, seq1=first_sequence, seq2=second_sequence)
+    timeline.invalidate_span_index()
+
+
+def invalidate_fade_curve_cache():
+    """Clears the fade curve cache, should be called when curves are removed, or strips are renamed"""
+
+    global fade_curve_cache_key
+    global fade_curve_cache_current
+    fade_curve_cache_key = None
+    fade_curve_cache_current = False
+    fade_curve_cache.clear()
+
+
+def outdate_fade_curve_cache():
+    #The scene was changed, curves may have been renamed, so the next missing curve will rebuild the cache once
+    global fade_curve_cache_current
+    fade_curve_cache_current = False
+
+
+def rebuild_fade_curve_cache(action):
+    global fade_curve_cache_key
+    global fade_curve_cache_current
+    fade_curve_cache.clear()
+    for index, curve in enumerate(action.fcurves):
+        if curve.data_path not in fade_curve_cache:
+            fade_curve_cache[curve.data_path] = index
+    fade_curve_cache_key = (action.as_pointer(), len(action.fcurves))
+    fade_curve_cache_current = True
+
+
+def find_curve(action, data_path):
+    """Finds the curve with the given data path in an action, using the fade curve cache
+    Arguments:
+        action: Action to look in
+        data_path: String, the full data path of the curve
+
+    Returns: An FCurve, or None if no curve was found"""
+
+    if fade_curve_cache_key != (action.as_pointer(), len(action.fcurves)):
+        #curves were added or removed, or this is a different action
+        rebuild_fade_curve_cache(action)
+    index = fade_curve_cache.get(data_path)
+    if index is None:
+        if fade_curve_cache_current:
+            return None
+        #the curve may have been renamed since the cache was built, rebuild and try again
+        rebuild_fade_curve_cache(action)
+        index = fade_curve_cache.get(data_path)
+        if index is None:
+            return None
+    curve = action.fcurves[index]
+    if curve.data_path != data_path:
+        #curves were changed without changing the number of curves, rebuild and try again
+        rebuild_fade_curve_cache(action)
+        index = fade_curve_cache.get(data_path)
+        if index is None:
+            return None
+        curve = action.fcurves[index]
+    return curve
 
 
 def get_fade_curve(context, sequence, create=False):
@@ -79,16 +146,13 @@ def get_fade_curve(context, sequence, create=False):
             return None
 
     all_curves = action.fcurves
-    fade_curve = None  #curve for the fades
-    for curve in all_curves:
-        if curve.data_path == 'sequence_editor.sequences_all["'+sequence.name+'"].'+fade_variable:
-            #keyframes found
-            fade_curve = curve
-            break
+    fade_curve = find_curve(action, 'sequence_editor.sequences_all["'+sequence.name+'"].'+fade_variable)
 
     #Create curve if needed
     if fade_curve is None and create:
         fade_curve = all_curves.new(data_path=sequence.path_from_id(fade_variable))
+        #the curve may not be added at the end of the list, so the cached indexes may be wrong now
+        invalidate_fade_curve_cache()
 
         #add a single keyframe to prevent blender from making the waveform invisible (bug)
         if sequence.type == 'SOUND':
@@ -102,6 +166,22 @@ def get_fade_curve(context, sequence, create=False):
     return fade_curve
 
 
+def get_fade_lengths(sequence, context=None):
+    """Detects the fade in and fade out lengths of a sequence
+    Arguments:
+        sequence: VSE Sequence object to check
+        context: Optional context, bpy.context will be used if not given
+
+    Returns: A list of [fade in length, fade out length], lengths are 0 if no fade is detected"""
+
+    if context is None:
+        context = bpy.context
+    fade_curve = get_fade_curve(context, sequence, create=False)
+    if not fade_curve:
+        return [0, 0]
+    return [fades(fade_curve, sequence, 'detect', 'in'), fades(fade_curve, sequence, 'detect', 'out')]
+
+
 def fades(fade_curve, sequence, mode, direction, fade_length=0, fade_low_point_frame=False):
     """Detects, creates, and edits fadein and fadeout for sequences.
     Arguments:
@@ -265,6 +345,7 @@ def set_fade(fade_curve, direction, fade_low_point_frame, fade_high_point_frame,
                 bpy.context.scene.animation_data.action.fcurves.remove(fade_curve)
             except:
                 pass
+            invalidate_fade_curve_cache()
         return
 
     if fade_high_point:
@@ -775,13 +856,7 @@ class VSEQF_PT_QuickFadesPanel(bpy.types.Panel):
         #Set up basic variables needed by panel
         scene = bpy.context.scene
         active_sequence = timeline.current_active(context)
-        fade_curve = get_fade_curve(context, active_sequence, create=False)
-        if fade_curve:
-            fadein = fades(fade_curve, active_sequence, 'detect', 'in')
-            fadeout = fades(fade_curve, active_sequence, 'detect', 'out')
-        else:
-            fadein = 0
-            fadeout = 0
+        fadein, fadeout = get_fade_lengths(active_sequence, context)
 
         layout = self.layout
 
@@ -859,13 +934,7 @@ class VSEQF_PT_QuickFadesStripPanel(bpy.types.Panel):
         #Set up basic variables needed by panel
         scene = bpy.context.scene
         active_sequence = timeline.current_active(context)
-        fade_curve = get_fade_curve(context, active_sequence, create=False)
-        if fade_curve:
-            fadein = fades(fade_curve, active_sequence, 'detect', 'in')
-            fadeout = fades(fade_curve, active_sequence, 'detect', 'out')
-        else:
-            fadein = 0
-            fadeout = 0
+        fadein, fadeout = get_fade_lengths(active_sequence, context)
 
         layout = self.layout
 
@@ -900,13 +969,7 @@ class VSEQFQuickFadesMenu(bpy.types.Menu):
         layout = self.layout
         if sequence and len(sequences) > 0:
             #If a sequence is active
-            fade_curve = get_fade_curve(context, sequence, create=False)
-            if fade_curve:
-                fadein = fades(fade_curve, sequence, 'detect', 'in')
-                fadeout = fades(fade_curve, sequence, 'detect', 'out')
-            else:
-                fadein = 0
-                fadeout = 0
+            fadein, fadeout = get_fade_lengths(sequence, context)
 
             #Detected fades section
             if fadein > 0:
@@ -1112,6 +1175,8 @@ class VSEQFQuickFadesCross(bpy.types.Operator):
                             #detected overlap is larger than target fade, subtract equal amounts from each sequence
                             first_sequence.frame_final_end = first_sequence.frame_final_end - first_sequence_offset
                             second_sequence.frame_final_start = second_sequence.frame_final_start + second_sequence_offset
+                        timeline.update_span_index(first_sequence)
+                        timeline.update_span_index(second_sequence)
                     fade_exists = find_crossfade(sequences, first_sequence, second_sequence)
                     if not fade_exists:
                         vseqf_crossfade(first_sequence, second_sequence)
@@ -1124,4 +1189,5 @@ class VSEQFQuickFadesCross(bpy.types.Operator):
             sequence.select = True
         if active_sequence:
             context.scene.sequence_editor.active_strip = active_sequence
+        timeline.invalidate_neighbour_index()
         return{'FINISHED'}
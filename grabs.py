@@ -1,5 +1,6 @@
 import bpy
 import os
+import bisect
 from . import vseqf
 from . import timeline
 from . import parenting
@@ -12,18 +13,22 @@ marker_grab_distance = 100
 
 
 class SequencePlaceHolder(object):
-    sequence = None
-    name = ''
-    frame_final_start = 0
-    frame_final_end = 0
-    frame_final_duration = 0
-    frame_start = 0
-    channel = 0
-    select = False
-    select_left_handle = False
-    select_right_handle = False
-    rippled = False
-    parent_data = None
+    #Stores the starting position of a strip, uses slots since one of these is made for every strip a grab can touch
+    __slots__ = ('sequence', 'name', 'frame_final_start', 'frame_final_end', 'frame_final_duration', 'frame_start', 'channel', 'select', 'select_left_handle', 'select_right_handle', 'rippled', 'parent_data')
+
+    def __init__(self, sequence=None, name='', frame_final_start=0, frame_final_end=0, frame_final_duration=0, frame_start=0, channel=0, select=False, select_left_handle=False, select_right_handle=False):
+        self.sequence = sequence
+        self.name = name
+        self.frame_final_start = frame_final_start
+        self.frame_final_end = frame_final_end
+        self.frame_final_duration = frame_final_duration
+        self.frame_start = frame_start
+        self.channel = channel
+        self.select = select
+        self.select_left_handle = select_left_handle
+        self.select_right_handle = select_right_handle
+        self.rippled = False
+        self.parent_data = None
 
 
 def get_click_mode(context):
@@ -35,6 +40,41 @@ def get_click_mode(context):
     return click_mode
 
 
+def set_sequence_position(sequence, channel, frame_start):
+    #Sets the channel and position of a strip, values are only written if they have changed to avoid extra updates
+    if sequence.channel != channel:
+        sequence.channel = channel
+    if sequence.frame_start != frame_start:
+        sequence.frame_start = frame_start
+
+
+def sequence_moved(sequence, data):
+    #Checks if a strip is in a different place than the given starting data
+    return sequence.channel != data.channel or sequence.frame_start != data.frame_start or sequence.frame_final_start != data.frame_final_start or sequence.frame_final_end != data.frame_final_end
+
+
+def restore_sequence(sequence, data):
+    """Attempts to put a strip directly back in its starting position
+    Arguments:
+        sequence: VSE Sequence object to restore
+        data: SequencePlaceHolder with the starting position
+
+    Returns: True if the strip ended up in its starting position, False if blender moved it somewhere else"""
+
+    if sequence.frame_start != data.frame_start:
+        sequence.frame_start = data.frame_start
+    if sequence.frame_final_start != data.frame_final_start:
+        sequence.frame_final_start = data.frame_final_start
+    if sequence.frame_final_end != data.frame_final_end:
+        sequence.frame_final_end = data.frame_final_end
+    if sequence.channel != data.channel:
+        sequence.channel = data.channel
+    if sequence.channel != data.channel or sequence.frame_start != data.frame_start:
+        #the channel may have been set before the strip was moved out of the way of another strip, try once more
+        set_sequence_position(sequence, data.channel, data.frame_start)
+    return not sequence_moved(sequence, data)
+
+
 def move_sequence_position(context, sequence, offset_x, offset_y, start_channel, start_frame_start, start_frame_final_start, start_frame_final_end):
     #Move a sequence by a given offset
 
@@ -43,11 +83,10 @@ def move_sequence_position(context, sequence, offset_x, offset_y, start_channel,
     channel = start_channel + offset_y
     if channel < 1:
         channel = 1
-    while timeline.sequencer_area_filled(new_start, new_end, channel, channel, [sequence]):
-        channel = channel + 1
+    channel = timeline.find_free_channel(new_start, new_end, channel, [sequence])
 
-    sequence.channel = channel
-    sequence.frame_start = start_frame_start + offset_x
+    set_sequence_position(sequence, channel, start_frame_start + offset_x)
+    timeline.update_span_index(sequence)
 
 
 def move_sequence_left_handle(context, sequence, offset_x, start_channel, start_frame_start, start_frame_final_start, start_frame_final_end, fix_fades=False, only_fix=False):
@@ -113,8 +152,7 @@ def move_sequence(context, sequence, offset_x, offset_y, select_left, select_rig
         #make sequences that are having the handles adjusted behave better
         new_start = sequence.frame_final_start
         new_end = sequence.frame_final_end
-        while timeline.sequencer_area_filled(new_start, new_end, new_channel, new_channel, [sequence]):
-            new_channel = new_channel + 1
+        new_channel = timeline.find_free_channel(new_start, new_end, new_channel, [sequence])
     if new_channel != sequence.channel:
         old_frame_start = sequence.frame_start
         sequence.channel = new_channel
@@ -126,6 +164,7 @@ def move_sequence(context, sequence, offset_x, offset_y, select_left, select_rig
         move_sequence_left_handle(context, sequence, offset_x, new_channel, start_frame_start, start_frame_final_start, start_frame_final_end, fix_fades=fix_fades, only_fix=only_fix)
     if select_right:  #Move right handle
         move_sequence_right_handle(context, sequence, offset_x, new_channel, start_frame_final_end, fix_fades=fix_fades, only_fix=only_fix)
+    timeline.update_span_index(sequence)
 
 
 def find_data_by_name(name, sequences):
@@ -137,18 +176,7 @@ def find_data_by_name(name, sequences):
 
 
 def copy_sequence(sequence):
-    data = SequencePlaceHolder()
-    data.sequence = sequence
-    data.name = sequence.name
-    data.frame_final_start = sequence.frame_final_start
-    data.frame_final_end = sequence.frame_final_end
-    data.frame_final_duration = sequence.frame_final_duration
-    data.frame_start = sequence.frame_start
-    data.channel = sequence.channel
-    data.select = sequence.select
-    data.select_left_handle = sequence.select_left_handle
-    data.select_right_handle = sequence.select_right_handle
-    return data
+    return SequencePlaceHolder(sequence, sequence.name, sequence.frame_final_start, sequence.frame_final_end, sequence.frame_final_duration, sequence.frame_start, sequence.channel, sequence.select, sequence.select_left_handle, sequence.select_right_handle)
 
 
 def copy_sequences(sequences):
@@ -158,29 +186,88 @@ def copy_sequences(sequences):
     return sequences_data
 
 
+def grab_scope(sequences):
+    """Finds every strip that may be moved when the given strips are moved, so only those need to be stored
+    Arguments:
+        sequences: list of VSE Sequence objects that will be moved
+
+    Returns: A list of VSE Sequence objects, the given strips followed by their children if parenting is enabled"""
+
+    if not vseqf.parenting():
+        return list(sequences)
+    scope = []
+    for sequence in sequences:
+        scope = parenting.get_recursive(sequence, scope)
+    #get_recursive skips locked and effect strips, keep them in case they are moved directly
+    return list(dict.fromkeys(list(sequences) + scope))
+
+
 def grab_starting_data(sequences):
+    """Stores the starting positions of strips
+    Arguments:
+        sequences: list of VSE Sequence objects, should be limited to the strips that may be moved, see grab_scope
+
+    Returns: A dictionary of strip name: SequencePlaceHolder"""
+
     data = {}
     for sequence in sequences:
         data[sequence.name] = copy_sequence(sequence)
     return data
 
 
-def move_sequences(context, starting_data, offset_x, offset_y, grabbed_sequences, fix_fades=False, ripple=False, ripple_pop=False, move_root=True, child_edges=False):
-    ripple_offset = 0
-    right_edges = []
+def build_move_plan(context, starting_data, grabbed_sequences):
+    """Finds the strips that need to be moved along with each grabbed strip, so a grab can be updated many times
+    without searching for children again
+    Arguments:
+        context: the current context
+        starting_data: dictionary of SequencePlaceHolder objects, as returned by grab_starting_data
+        grabbed_sequences: list of VSE Sequence objects being moved
 
-    #Adjust grabbed strips
+    Returns: A tuple with one (sequence, data, children) entry for each grabbed strip.  'children' is a tuple of
+        (child, child_data, primary, select_left, select_right) entries, 'primary' is True for direct children of the
+        grabbed strip, 'select_left' and 'select_right' are the child edges that follow the grabbed strip edges."""
+
+    is_parenting = vseqf.parenting()
+    move_edges = context.scene.vseqf.move_edges
+    plan = []
     for sequence in grabbed_sequences:
         data = starting_data[sequence.name]
+        children = []
+        if is_parenting:
+            for child in parenting.get_recursive(sequence, []):
+                if child == sequence:
+                    continue
+                child_data = starting_data[child.name]
+                primary = child.parent == sequence.name
+                select_left = False
+                select_right = False
+                if primary and move_edges and (data.select_left_handle or data.select_right_handle):
+                    #Move edges along with parent if applicable
+                    if child_data.frame_final_start == data.frame_final_start:
+                        select_left = data.select_left_handle
+                    if child_data.frame_final_end == data.frame_final_end:
+                        select_right = data.select_right_handle
+                children.append((child, child_data, primary, select_left, select_right))
+        plan.append((sequence, data, tuple(children)))
+    return tuple(plan)
+
+
+def move_sequences(context, starting_data, offset_x, offset_y, grabbed_sequences, fix_fades=False, ripple=False, ripple_pop=False, move_root=True, child_edges=False, move_plan=None):
+    ripple_offset = 0
+    if move_plan is None:
+        move_plan = build_move_plan(context, starting_data, grabbed_sequences)
+
+    #Adjust grabbed strips
+    for sequence, data, children in move_plan:
         move_sequence(context, sequence, offset_x, offset_y, data.select_left_handle, data.select_right_handle, data.channel, data.frame_start, data.frame_final_start, data.frame_final_end, ripple=ripple, fix_fades=fix_fades, only_fix=not move_root)
-        right_edges.append(sequence.frame_final_end)
 
         if ripple:
-            if sequence.select_left_handle and not sequence.select_right_handle and len(grabbed_sequences) == 1:
+            if sequence.select_left_handle and not sequence.select_right_handle and len(move_plan) == 1:
                 #special ripple slide if only one sequence and left handle grabbed
                 frame_start = data.frame_final_start
                 ripple_offset = ripple_offset + frame_start - sequence.frame_final_start
                 sequence.frame_start = data.frame_start + ripple_offset
+                timeline.update_span_index(sequence)
                 #offset_x = ripple_offset
             else:
                 if ripple_pop and sequence.channel != data.channel:
@@ -191,36 +278,18 @@ def move_sequences(context, starting_data, offset_x, offset_y, grabbed_sequences
                     ripple_offset = data.frame_final_end - sequence.frame_final_end
                     ripple_offset = 0 - ripple_offset
 
-        if vseqf.parenting():
+        if children:
             #Adjust children of grabbed sequence
-            children = parenting.get_recursive(sequence, [])
             root_offset_x = sequence.frame_start - data.frame_start
             root_offset_y = sequence.channel - data.channel
-            for child in children:
-                if child == sequence:
-                    continue
-                child_data = starting_data[child.name]
-                if child.parent == sequence.name:
-                    #Primary children
-                    if data.select_left_handle or data.select_right_handle:
-                        #Move edges along with parent if applicable
-                        if context.scene.vseqf.move_edges:
-                            if child_data.frame_final_start == data.frame_final_start:
-                                select_left = data.select_left_handle
-                            else:
-                                select_left = False
-                            if child_data.frame_final_end == data.frame_final_end:
-                                select_right = data.select_right_handle
-                            else:
-                                select_right = False
-                            if select_left or select_right:
-                                move_sequence(context, child, offset_x, offset_y, select_left, select_right, child_data.channel, child_data.frame_start, child_data.frame_final_start, child_data.frame_final_end, ripple=ripple, fix_fades=fix_fades)
-                        if not data.select_right_handle:
-                            child.frame_start = child_data.frame_start + ripple_offset
-                    else:
-                        move_sequence(context, child, root_offset_x, root_offset_y, False, False, child_data.channel, child_data.frame_start, child_data.frame_final_start, child_data.frame_final_end)
+            for child, child_data, primary, select_left, select_right in children:
+                if primary and (data.select_left_handle or data.select_right_handle):
+                    if select_left or select_right:
+                        move_sequence(context, child, offset_x, offset_y, select_left, select_right, child_data.channel, child_data.frame_start, child_data.frame_final_start, child_data.frame_final_end, ripple=ripple, fix_fades=fix_fades)
+                    if not data.select_right_handle and child.frame_start != child_data.frame_start + ripple_offset:
+                        child.frame_start = child_data.frame_start + ripple_offset
                 else:
-                    #Children of children, only move them if the root sequence has moved
+                    #Secondary children and children of moved strips follow the root strip
                     move_sequence(context, child, root_offset_x, root_offset_y, False, False, child_data.channel, child_data.frame_start, child_data.frame_final_start, child_data.frame_final_end)
                 if child_edges:
                     #Snap edges of children to edge of parent
@@ -228,6 +297,7 @@ def move_sequences(context, starting_data, offset_x, offset_y, grabbed_sequences
                         child.frame_final_start = sequence.frame_final_start
                     if sequence.select_right_handle:
                         child.frame_final_end = sequence.frame_final_end
+                timeline.update_span_index(child)
 
     return ripple_offset
 
@@ -236,66 +306,126 @@ def grab_ripple_markers(ripple_markers, ripple, ripple_offset):
     for marker_data in ripple_markers:
         marker, original_frame = marker_data
         if ripple:
-            marker.frame = original_frame + ripple_offset
+            frame = original_frame + ripple_offset
         else:
-            marker.frame = original_frame
+            frame = original_frame
+        if marker.frame != frame:
+            marker.frame = frame
+    timeline.invalidate_marker_index()
 
 
 def grab_ripple_sequences(starting_data, ripple_sequences, ripple, ripple_offset):
+    #Moves the strips after the grabbed strips, returns True if some strips could not be put back in place yet
+    restoring = False
+    if ripple_offset > 0:
+        #moving forward, move the last strips first so strips dont land on others that have not moved yet
+        ripple_sequences = reversed(ripple_sequences)
     for sequence in ripple_sequences:
         data = starting_data[sequence.name]
         if ripple:
             data.rippled = True
-            new_channel = data.channel
-            while timeline.sequencer_area_filled(data.frame_final_start + ripple_offset, data.frame_final_end + ripple_offset, new_channel, new_channel, [sequence]):
-                new_channel = new_channel + 1
-            sequence.channel = new_channel
-            sequence.frame_start = data.frame_start + ripple_offset
+            new_channel = timeline.find_free_channel(data.frame_final_start + ripple_offset, data.frame_final_end + ripple_offset, data.channel, [sequence])
+            set_sequence_position(sequence, new_channel, data.frame_start + ripple_offset)
+            timeline.update_span_index(sequence)
 
         if data.rippled and not ripple:
             #fix sequence locations when ripple is disabled
-            new_channel = data.channel
-            new_start = data.frame_final_start
-            new_end = data.frame_final_end
-            while timeline.sequencer_area_filled(new_start, new_end, new_channel, new_channel, [sequence]):
-                new_channel = new_channel + 1
-            sequence.channel = new_channel
-            sequence.frame_start = data.frame_start
+            new_channel = timeline.find_free_channel(data.frame_final_start, data.frame_final_end, data.channel, [sequence])
+            set_sequence_position(sequence, new_channel, data.frame_start)
+            timeline.update_span_index(sequence)
             if sequence.frame_start == data.frame_start and sequence.channel == data.channel:
                 #unfortunately, there seems to be a limitation in blender preventing me from putting the strip back where it should be... keep trying until the grabbed strips are out of the way.
                 data.rippled = False
+            else:
+                restoring = True
+    return restoring
+
+
+def add_occupied(occupied, channel, start, end):
+    #adds a frame range to a dictionary of channel: sorted list of [start, end]
+    if channel not in occupied:
+        occupied[channel] = []
+    bisect.insort(occupied[channel], [start, end])
+
+
+def is_occupied(occupied, channel, start, end):
+    #checks if a frame range overlaps any range in a channel of an occupied dictionary, see add_occupied
+    ranges = occupied.get(channel)
+    if not ranges:
+        return False
+    index = bisect.bisect_left(ranges, [start, end])
+    #ranges in a channel never overlap each other, so only the ranges on either side need to be checked
+    for other_start, other_end in ranges[max(index - 1, 0):index + 1]:
+        if other_start < end and start < other_end:
+            return True
+    return False
+
+
+def plan_ripple(sequences, start_frame, ripple_amount):
+    """Works out where each strip moved by a ripple will end up, so they can be moved without landing on each other
+    Arguments:
+        sequences: List of VSE Sequence objects to ripple
+        start_frame: Integer, strips starting after this frame will be moved
+        ripple_amount: Integer, number of frames to move the strips by, negative values move strips back
+
+    Returns: A list of [sequence, channel, frame_start] lists, in the order the strips should be moved.  Effect strips
+        are included with their current position since they follow their input strips."""
+
+    to_move = []
+    effects = []
+    occupied = {}
+    for sequence in sequences:
+        moved = sequence.frame_final_end > start_frame - ripple_amount and sequence.frame_final_start > start_frame
+        if not moved:
+            #every strip staying in place is in the way of moved strips, effect strips included
+            add_occupied(occupied, sequence.channel, sequence.frame_final_start, sequence.frame_final_end)
+        elif hasattr(sequence, 'input_1'):
+            effects.append([sequence, sequence.channel, sequence.frame_start])
+        else:
+            to_move.append(sequence)
+
+    #strips are moved in the direction of travel, the strips furthest along are moved first
+    to_move.sort(key=lambda x: x.frame_final_start, reverse=ripple_amount > 0)
+    plan = []
+    for sequence in to_move:
+        start = sequence.frame_final_start + ripple_amount
+        end = sequence.frame_final_end + ripple_amount
+        channel = sequence.channel
+        while is_occupied(occupied, channel, start, end):
+            channel = channel + 1
+        add_occupied(occupied, channel, start, end)
+        plan.append([sequence, channel, sequence.frame_start + ripple_amount])
+    return plan + effects
 
 
 def ripple_timeline(sequences, start_frame, ripple_amount, select_ripple=True, markers=[]):
     """Moves all given sequences starting after the frame given as 'start_frame', by moving them forward by 'ripple_amount' frames.
     'select_ripple' will select all sequences that were moved."""
 
-    to_change = []
-    for sequence in sequences:
-        if sequence.frame_final_end > start_frame - ripple_amount and sequence.frame_final_start > start_frame:
-            to_change.append([sequence, sequence.channel, sequence.frame_start + ripple_amount, True])
-    for seq in to_change:
-        sequence = seq[0]
-        sequence.channel = seq[1]
+    plan = plan_ripple(sequences, start_frame, ripple_amount)
+    retry = []
+    for sequence, channel, frame_start in plan:
         if not hasattr(sequence, 'input_1'):
-            sequence.frame_start = seq[2]
+            set_sequence_position(sequence, channel, frame_start)
+            if sequence.frame_start != frame_start or sequence.channel != channel:
+                #blender moved the strip somewhere else, another strip may have still been in the way
+                retry.append([sequence, channel, frame_start])
         if select_ripple:
             sequence.select = True
-        if (sequence.frame_start != seq[2] or sequence.channel != seq[1]) and seq[3]:
-            seq[3] = False
-            to_change.append(seq)
+    for sequence, channel, frame_start in retry:
+        set_sequence_position(sequence, channel, frame_start)
+    timeline.invalidate_span_index()
     if markers:
         for marker in markers:
             if marker.frame >= (start_frame - ripple_amount):
                 marker.frame = marker.frame + ripple_amount
+        timeline.invalidate_marker_index()
 
 
 def near_marker(context, frame):
-    if context.scene.timeline_markers:
-        markers = sorted(context.scene.timeline_markers, key=lambda x: abs(x.frame - frame))
-        marker = markers[0]
-        if abs(marker.frame - frame) <= marker_grab_distance:
-            return marker
+    marker = timeline.find_marker_frame(context.scene, frame, 'closest')
+    if marker is not None and abs(marker.frame - frame) <= marker_grab_distance:
+        return marker
     return None
 
 
@@ -485,6 +615,11 @@ class VSEQFGrabAdd(bpy.types.Operator):
     timeline_height = 1
     ripple_start = 0
     ripple_left = 0
+    move_plan = ()
+    movable_sequences = ()
+    movable_effects = ()
+    last_applied = None
+    restoring = False
 
     def vseqf_grab_draw(self, context):
         #Callback function to draw overlays in sequencer when grab is activated
@@ -501,40 +636,68 @@ class VSEQFGrabAdd(bpy.types.Operator):
                 mode = 'Grab'
 
         view = context.region.view2d
+        overlay = vseqf.OverlayBatch()
         for seq in self.grabbed_sequences:
             sequence = seq
             window_x, window_y = view.view_to_region(sequence.frame_final_start, sequence.channel)
-            vseqf.draw_text(window_x, window_y - 6, 12, mode, text_color)
+            overlay.add_text(window_x, window_y - 6, 12, mode, color=text_color)
+        overlay.draw()
 
     def reset_markers(self):
         for marker_data in self.ripple_markers:
             marker, original_frame = marker_data
             marker.frame = original_frame
+        timeline.invalidate_marker_index()
 
     def reset_sequences(self):
-        #used when cancelling, puts everything back to where it was at the beginning by first moving it somewhere safe, then to the true location
+        #used when cancelling, puts only the strips that were moved back to where they were at the beginning.
+        #Strips are put directly back once their starting area is clear, any that cannot be placed are moved somewhere safe first, then to the true location
 
         self.reset_markers()
-        timeline_length = self.timeline_end - self.timeline_start
-
-        for sequence in self.sequences:
-            data = self.starting_data[sequence.name]
-            if not hasattr(sequence, 'input_1'):
+        moved = []
+        for sequence in self.movable_sequences:
+            if sequence_moved(sequence, self.starting_data[sequence.name]):
+                moved.append(sequence)
+        timeline.invalidate_span_index()
+        while moved:
+            remaining = []
+            for sequence in moved:
+                data = self.starting_data[sequence.name]
+                if timeline.sequencer_area_filled(data.frame_final_start, data.frame_final_end, data.channel, data.channel, [sequence]):
+                    #another strip is still in the way, try again after the others are moved
+                    remaining.append(sequence)
+                    continue
+                if not restore_sequence(sequence, data):
+                    remaining.append(sequence)
+                timeline.update_span_index(sequence)
+            if len(remaining) == len(moved):
+                #no more strips can be placed directly
+                break
+            moved = remaining
+
+        if moved:
+            timeline_length = self.timeline_end - self.timeline_start
+            for sequence in moved:
+                data = self.starting_data[sequence.name]
                 sequence.channel = data.channel + self.timeline_height
                 sequence.frame_start = data.frame_start + timeline_length
                 sequence.frame_final_start = data.frame_final_start + timeline_length
                 sequence.frame_final_end = data.frame_final_end + timeline_length
-            else:
-                sequence.channel = data.channel + self.timeline_height
-        for sequence in self.sequences:
-            data = self.starting_data[sequence.name]
-            if not hasattr(sequence, 'input_1'):
+            for sequence in moved:
+                data = self.starting_data[sequence.name]
                 sequence.channel = data.channel
                 sequence.frame_start = data.frame_start
-            else:
-                sequence.channel = data.channel
+
+        #put effects of the moved strips back in their channels, moving them out of the way first like the strips
+        moved_effects = [effect for effect in self.movable_effects if effect.channel != self.starting_data[effect.name].channel]
+        for effect in moved_effects:
+            effect.channel = self.starting_data[effect.name].channel + self.timeline_height
+        for effect in moved_effects:
+            effect.channel = self.starting_data[effect.name].channel
+        timeline.invalidate_span_index()
         return
 
+    @vseqf.instrument('grab_modal')
     def modal(self, context, event):
         release_confirm = bpy.context.preferences.inputs.use_drag_immediately
 
@@ -584,6 +747,8 @@ class VSEQFGrabAdd(bpy.types.Operator):
                         else:
                             overlay_frame = self.secondary_snap_edge_sequence.frame_final_end - 1
                         context.scene.sequence_editor.overlay_frame = overlay_frame - frame
+        #the built-in grab operator moves strips between each update, so the span index needs to be refreshed
+        timeline.invalidate_span_index()
         offset_x = 0
         pos_y = self.target_grab_sequence.channel
         if self.target_grab_variable == 'frame_start':
@@ -603,10 +768,14 @@ class VSEQFGrabAdd(bpy.types.Operator):
 
         if reset_sequences:
             self.reset_sequences()
-        ripple_offset = move_sequences(context, self.starting_data, offset_x, offset_y, self.grabbed_sequences, ripple_pop=self.ripple_pop, fix_fades=False, ripple=self.ripple, move_root=False)
-        grab_ripple_sequences(self.starting_data, self.ripple_sequences, self.ripple, ripple_offset)
-        if context.scene.vseqf.ripple_markers:
-            grab_ripple_markers(self.ripple_markers, self.ripple, ripple_offset)
+        #only update strips if something has changed since the last update, or rippled strips still need to be put back
+        grab_state = (offset_x, offset_y, self.ripple, self.ripple_pop)
+        if reset_sequences or self.restoring or grab_state != self.last_applied:
+            ripple_offset = move_sequences(context, self.starting_data, offset_x, offset_y, self.grabbed_sequences, ripple_pop=self.ripple_pop, fix_fades=False, ripple=self.ripple, move_root=False, move_plan=self.move_plan)
+            self.restoring = grab_ripple_sequences(self.starting_data, self.ripple_sequences, self.ripple, ripple_offset)
+            if context.scene.vseqf.ripple_markers:
+                grab_ripple_markers(self.ripple_markers, self.ripple, ripple_offset)
+            self.last_applied = grab_state
 
         if event.type in {'LEFTMOUSE', 'RET'} or (release_confirm and event.value == 'RELEASE'):
             vu_meter.vu_meter_calculate(context.scene)
@@ -616,7 +785,7 @@ class VSEQFGrabAdd(bpy.types.Operator):
                 fix_fades = True
             else:
                 fix_fades = False
-            ripple_offset = move_sequences(context, self.starting_data, offset_x, offset_y, self.grabbed_sequences, ripple_pop=self.ripple_pop, fix_fades=fix_fades, ripple=self.ripple, move_root=False)
+            ripple_offset = move_sequences(context, self.starting_data, offset_x, offset_y, self.grabbed_sequences, ripple_pop=self.ripple_pop, fix_fades=fix_fades, ripple=self.ripple, move_root=False, move_plan=self.move_plan)
             grab_ripple_sequences(self.starting_data, self.ripple_sequences, self.ripple, ripple_offset)
             if context.scene.vseqf.ripple_markers:
                 grab_ripple_markers(self.ripple_markers, self.ripple, ripple_offset)
@@ -695,7 +864,6 @@ class VSEQFGrabAdd(bpy.types.Operator):
             if marker.frame >= self.ripple_start:
                 self.ripple_markers.append([marker, marker.frame])
 
-        self.starting_data = grab_starting_data(sequences)
         #generate grabbed sequences and ripple sequences lists
         for sequence in sequences:
             if not sequence.lock and not hasattr(sequence, 'input_1'):
@@ -710,6 +878,31 @@ class VSEQFGrabAdd(bpy.types.Operator):
         self._timer = context.window_manager.event_timer_add(time_step=0.01, window=context.window)
         self.ripple_sequences.sort(key=lambda x: x.frame_final_start)
         self.grabbed_sequences.sort(key=lambda x: x.frame_final_start)
+        #only store the strips this grab can move
+        self.starting_data = grab_starting_data(grab_scope(self.grabbed_sequences + self.ripple_sequences))
+        timeline.invalidate_span_index()
+        #work out everything that moves with the grabbed strips once, instead of on every update
+        self.move_plan = build_move_plan(context, self.starting_data, self.grabbed_sequences)
+        #keep track of every strip this grab can move, so cancelling only needs to check these
+        movable_sequences = []
+        for sequence, data, children in self.move_plan:
+            movable_sequences.append(sequence)
+            for child in children:
+                movable_sequences.append(child[0])
+        movable_sequences.extend(self.ripple_sequences)
+        self.movable_sequences = tuple(dict.fromkeys(movable_sequences))
+        #effects follow their inputs and may be pushed to other channels, store them so cancelling can put them back
+        movable_names = set(sequence.name for sequence in self.movable_sequences)
+        movable_effects = []
+        for sequence in sequences:
+            if hasattr(sequence, 'input_1') and sequence.input_1:
+                input_2 = getattr(sequence, 'input_2', None)
+                if sequence.input_1.name in movable_names or (input_2 and input_2.name in movable_names):
+                    movable_effects.append(sequence)
+        self.movable_effects = tuple(movable_effects)
+        self.starting_data.update(grab_starting_data(movable_effects))
+        self.last_applied = None
+        self.restoring = False
         grabbed_left = False
         grabbed_right = False
         grabbed_center = False
@@ -3,6 +3,133 @@ from . import vseqf
 from . import timeline
 
 
+#Parenting index, stores parent name -> list of child names, and child name -> parent name.
+#Only the sequencer level being edited is indexed, the same sequences that were searched before the index existed.
+#Strips are always stored by name and resolved through the sequence editor, since strip objects become invalid after undo.
+parent_index = {}
+child_index = {}
+index_key = None
+
+
+def get_all_sequences():
+    #all sequences in the sequencer level being edited
+    sequences = timeline.level_sequences(bpy.context.scene)
+    if sequences is None:
+        return []
+    return sequences
+
+
+def lookup_sequence(name):
+    """Finds a sequence by name in the sequencer level being edited
+    Argument:
+        name: String, name of the sequence to find
+
+    Returns: VSE Sequence object, or None if not found"""
+
+    if not name:
+        return None
+    sequences = get_all_sequences()
+    if not sequences:
+        return None
+    return sequences.get(name)
+
+
+def invalidate_index():
+    #Clears the parenting index, it will be rebuilt the next time it is needed
+    global index_key
+    parent_index.clear()
+    child_index.clear()
+    index_key = None
+
+
+def rebuild_index():
+    """Performs a full rebuild of the parenting index from the parent properties of all sequences in the sequencer
+    level being edited"""
+
+    global index_key
+    parent_index.clear()
+    child_index.clear()
+    for sequence in get_all_sequences():
+        if sequence.parent:
+            index_add(sequence.name, sequence.parent)
+    index_key = timeline.level_key(bpy.context.scene)
+
+
+def ensure_index():
+    #Rebuilds the index if it was invalidated or built for another scene or meta strip
+    if index_key is None or index_key != timeline.level_key(bpy.context.scene):
+        rebuild_index()
+
+
+def index_add(child_name, parent_name):
+    index_remove(child_name)
+    children = parent_index.setdefault(parent_name, [])
+    if child_name not in children:
+        children.append(child_name)
+    child_index[child_name] = parent_name
+
+
+def index_remove(child_name):
+    old_parent_name = child_index.pop(child_name, None)
+    if old_parent_name is not None:
+        children = parent_index.get(old_parent_name)
+        if children and child_name in children:
+            children.remove(child_name)
+            if not children:
+                del parent_index[old_parent_name]
+
+
+def index_sequence(sequence):
+    """Updates the index entry for a single sequence based on its parent property, used for new, duplicated or cut sequences
+    Argument:
+        sequence: VSE Sequence object to index"""
+
+    ensure_index()
+    if sequence.parent:
+        index_add(sequence.name, sequence.parent)
+    else:
+        index_remove(sequence.name)
+
+
+def index_rename(old_name, new_name):
+    """Updates the index after a sequence has been renamed.  Children stay listed under the old name until they are
+    reassigned with add_children.
+    Arguments:
+        old_name: String, the previous name of the sequence
+        new_name: String, the current name of the sequence"""
+
+    ensure_index()
+    parent_name = child_index.pop(old_name, None)
+    if parent_name is not None:
+        children = parent_index.get(parent_name, [])
+        if old_name in children:
+            children[children.index(old_name)] = new_name
+        else:
+            children.append(new_name)
+        child_index[new_name] = parent_name
+
+
+def check_index():
+    """Compares the parenting index against the parent properties of all sequences
+    Returns: List of mismatches, each an [child name, indexed parent name, actual parent name] list.  Empty if the index is consistent."""
+
+    ensure_index()
+    mismatches = []
+    checked = set()
+    for sequence in get_all_sequences():
+        checked.add(sequence.name)
+        indexed_parent = child_index.get(sequence.name)
+        actual_parent = sequence.parent if sequence.parent else None
+        if indexed_parent != actual_parent:
+            mismatches.append([sequence.name, indexed_parent, actual_parent])
+        elif actual_parent is not None and sequence.name not in parent_index.get(actual_parent, []):
+            mismatches.append([sequence.name, None, actual_parent])
+    for child_name, parent_name in child_index.items():
+        if child_name not in checked:
+            mismatches.append([child_name, parent_name, None])
+    return mismatches
+
+
 def get_recursive(sequence, sequences):
     #recursively gathers all children of children of the given sequence
     if not sequence.lock and not hasattr(sequence, 'input_1'):
@@ -20,9 +147,11 @@ def add_children(parent_sequence, child_sequences):
         parent_sequence: VSE Sequence to set as the parent
         child_sequences: List of VSE Sequence objects to set as children"""
 
+    ensure_index()
     for child_sequence in child_sequences:
         if child_sequence.name != parent_sequence.name:
             child_sequence.parent = parent_sequence.name
+            index_add(child_sequence.name, parent_sequence.name)
 
 
 def find_children(parent_sequence, name=False, sequences=False):
@@ -30,7 +159,7 @@ def find_children(parent_sequence, name=False, sequences=False):
     Arguments:
         parent_sequence: VSE Sequence object or String name of a sequence to search for children of
         name: Boolean, if True, the passed-in 'parent_sequence' is a name of the parent, if False, the passed in 'parent_sequence' is the actual sequence object
-        sequences: Optional, a list of sequences may be passed in here, they will be the only ones searched
+        sequences: Optional, a list of sequences may be passed in here, only children in this list will be returned
 
     Returns: List of VSE Sequence objects, or empty list if none found"""
 
@@ -38,12 +167,29 @@ def find_children(parent_sequence, name=False, sequences=False):
         parent_name = parent_sequence
     else:
         parent_name = parent_sequence.name
-    if not sequences:
-        sequences = timeline.current_sequences(bpy.context)
+    ensure_index()
+    child_sequences = indexed_children(parent_name)
+    if child_sequences is None:
+        #stale entry, a child was deleted, renamed or reparented without the index being updated.  Other children may
+        #be missing from the index for the same reason, so rebuild it.
+        rebuild_index()
+        child_sequences = indexed_children(parent_name)
+        if child_sequences is None:
+            child_sequences = []
+    if sequences and child_sequences:
+        sequence_names = set(sequence.name for sequence in sequences)
+        child_sequences = [child for child in child_sequences if child.name in sequence_names]
+    return child_sequences
+
+
+def indexed_children(parent_name):
+    #Resolves the indexed children of a parent, returns None if an entry does not match its sequence
     child_sequences = []
-    for sequence in sequences:
-        if sequence.parent == parent_name:
-            child_sequences.append(sequence)
+    for child_name in parent_index.get(parent_name, []):
+        child = lookup_sequence(child_name)
+        if child is None or child.parent != parent_name:
+            return None
+        child_sequences.append(child)
     return child_sequences
 
 
@@ -56,12 +202,10 @@ def find_parent(child_sequence):
 
     if not child_sequence.parent:
         return False
-    sequences = timeline.current_sequences(bpy.context)
-    for sequence in sequences:
-        if sequence.name == child_sequence.parent:
-            return sequence
-    else:
+    parent = lookup_sequence(child_sequence.parent)
+    if parent is None:
         return False
+    return parent
 
 
 def clear_children(parent_sequence):
@@ -80,6 +224,7 @@ def clear_parent(child_sequence):
     Argument:
         child_sequence: VSE Sequence object to remove the parent relationship of"""
     child_sequence.parent = ''
+    index_remove(child_sequence.name)
 
 
 def select_children(parent_sequence, sequences=False):
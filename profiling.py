@@ -0,0 +1,88 @@
+import bpy
+from . import vseqf
+
+
+def timing_report():
+    """Formats the recorded run times as a text table
+    Returns: String"""
+
+    lines = ['VSEQF Profile', '', 'Name'.ljust(40)+'Calls'.rjust(10)+'Total ms'.rjust(12)+'Mean ms'.rjust(10)+'P95 ms'.rjust(10)+'Max ms'.rjust(10)]
+    for timing in sorted(vseqf.timings.values(), key=lambda x: x.total, reverse=True):
+        maximum = max(timing.samples) if timing.samples else 0.0
+        lines.append(timing.name.ljust(40)+str(timing.count).rjust(10)+format(timing.total * 1000, '.2f').rjust(12)+format(timing.mean() * 1000, '.3f').rjust(10)+format(timing.percentile(95) * 1000, '.3f').rjust(10)+format(maximum * 1000, '.3f').rjust(10))
+    lines.append('')
+    lines.append('P95 and Max are calculated from the last '+str(vseqf.instrumentation_samples)+' calls of each function.')
+    return '\n'.join(lines)
+
+
+class VSEQF_PT_Profiling(bpy.types.Panel):
+    """Panel showing the run times of VSEQF handlers and operators"""
+    bl_label = "VSEQF Profiling"
+    bl_space_type = 'SEQUENCE_EDITOR'
+    bl_region_type = 'UI'
+    bl_category = "Sequencer"
+    bl_options = {'DEFAULT_CLOSED'}
+
+    def draw(self, context):
+        del context
+        layout = self.layout
+        row = layout.row()
+        if vseqf.instrumentation_enabled:
+            row.operator('vseqf.profiling_toggle', text='Stop Recording', icon='PAUSE', depress=True)
+        else:
+            row.operator('vseqf.profiling_toggle', text='Start Recording', icon='REC')
+        row = layout.row()
+        row.operator('vseqf.profiling_clear', text='Clear', icon='X')
+        row.operator('vseqf.profiling_export', text='Export', icon='TEXT')
+        if not vseqf.timings:
+            layout.label(text='Nothing recorded yet')
+            return
+        box = layout.box()
+        row = box.row()
+        row.label(text='Name')
+        row.label(text='Calls')
+        row.label(text='Mean ms')
+        row.label(text='P95 ms')
+        for timing in sorted(vseqf.timings.values(), key=lambda x: x.total, reverse=True):
+            row = box.row()
+            row.label(text=timing.name)
+            row.label(text=str(timing.count))
+            row.label(text=format(timing.mean() * 1000, '.2f'))
+            row.label(text=format(timing.percentile(95) * 1000, '.2f'))
+
+
+class VSEQFProfilingToggle(bpy.types.Operator):
+    """Starts or stops recording the run times of VSEQF handlers and operators"""
+    bl_idname = 'vseqf.profiling_toggle'
+    bl_label = 'Toggle VSEQF Profiling'
+
+    def execute(self, context):
+        vseqf.instrumentation_enabled = not vseqf.instrumentation_enabled
+        vseqf.redraw_sequencers()
+        return {'FINISHED'}
+
+
+class VSEQFProfilingClear(bpy.types.Operator):
+    """Clears all recorded run times"""
+    bl_idname = 'vseqf.profiling_clear'
+    bl_label = 'Clear VSEQF Profiling'
+
+    def execute(self, context):
+        vseqf.clear_timings()
+        vseqf.redraw_sequencers()
+        return {'FINISHED'}
+
+
+class VSEQFProfilingExport(bpy.types.Operator):
+    """Saves the recorded run times to a text datablock"""
+    bl_idname = 'vseqf.profiling_export'
+    bl_label = 'Export VSEQF Profiling'
+
+    def execute(self, context):
+        text_document = bpy.data.texts.get('VSEQF Profile')
+        if text_document is None:
+            text_document = bpy.data.texts.new('VSEQF Profile')
+        text_document.clear()
+        text_document.from_string(timing_report())
+        self.report({'INFO'}, "Profile saved, check 'VSEQF Profile' in the text editor")
+        return {'FINISHED'}
@@ -1,5 +1,6 @@
 import bpy
 from . import parenting
+from . import timeline
 from . import vseqf
 
 
@@ -33,6 +34,8 @@ def nudge_selected(frame=0, channel=0):
             if newchannel > 0:
                 sequence.channel = newchannel
                 sequence.frame_start = oldframe
+    timeline.invalidate_span_index()
+    timeline.invalidate_edge_index()
 
 
 def find_marker(frame, direction):
@@ -41,27 +44,7 @@ def find_marker(frame, direction):
     returns a marker object, or None if none found.
     """
 
-    return_marker = None
-    best_delta = None
-    for marker in bpy.context.scene.timeline_markers:
-        if direction == 'next':
-            if marker.frame > frame:
-                delta = marker.frame - frame
-                if best_delta is None or delta < best_delta:
-                    best_delta = delta
-                    return_marker = marker
-        elif direction == 'previous':
-            if marker.frame < frame:
-                delta = frame - marker.frame
-                if best_delta is None or delta < best_delta:
-                    best_delta = delta
-                    return_marker = marker
-        else:
-            delta = abs(frame - marker.frame)
-            if best_delta is None or delta < best_delta:
-                best_delta = delta
-                return_marker = marker
-    return return_marker
+    return timeline.find_marker_frame(bpy.context.scene, frame, direction)
 
 
 def find_edge(frame, direction):
@@ -70,24 +53,7 @@ def find_edge(frame, direction):
     returns a frame number, or None if none found.
     """
 
-    new_frame = None
-    best_delta = None
-    for sequence in bpy.context.scene.sequence_editor.sequences:
-        edges = [sequence.frame_final_start, sequence.frame_final_end]
-        for edge in edges:
-            if direction == 'next':
-                if edge > frame:
-                    delta = edge - frame
-                    if best_delta is None or delta < best_delta:
-                        best_delta = delta
-                        new_frame = edge
-            else:
-                if edge < frame:
-                    delta = frame - edge
-                    if best_delta is None or delta < best_delta:
-                        best_delta = delta
-                        new_frame = edge
-    return new_frame
+    return timeline.find_edge_frame(bpy.context.scene, frame, direction)
 
 
 class VSEQFQuickShortcutsNudge(bpy.types.Operator):
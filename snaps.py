@@ -104,6 +104,7 @@ class VSEQFQuickSnaps(bpy.types.Operator):
         scene = context.scene
         active = timeline.current_active(context)
         sequences = timeline.current_sequences(context)
+        timeline.invalidate_span_index()
 
         #Cursor snaps
         if self.type == 'cursor_to_seconds':
@@ -121,6 +122,7 @@ class VSEQFQuickSnaps(bpy.types.Operator):
             closest_marker = shortcuts.find_marker(scene.frame_current, 'closest')
             if closest_marker is not None:
                 closest_marker.frame = scene.frame_current
+                timeline.invalidate_marker_index()
 
         #Sequence snaps
         else:
@@ -149,7 +151,7 @@ class VSEQFQuickSnaps(bpy.types.Operator):
                 return{'CANCELLED'}
 
             to_snap.sort(key=lambda x: x.frame_final_start)
-            starting_data = grabs.grab_starting_data(sequences)
+            starting_data = grabs.grab_starting_data(grabs.grab_scope(to_snap))
 
             if self.type == 'begin_to_cursor':
                 snap_target = context.scene.frame_current
@@ -226,6 +228,6 @@ class VSEQFQuickSnaps(bpy.types.Operator):
                 snap_target = context.scene.frame_current
                 offset_x = (snap_target - start.frame_final_start)
                 grabs.move_sequences(context, starting_data, offset_x, 0, to_snap)
-
+            timeline.invalidate_span_index()
 
         return{'FINISHED'}
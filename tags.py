@@ -3,38 +3,443 @@ from . import vseqf
 from . import timeline
 
 
-def populate_selected_tags():
+#Tag index, stores tag text -> set of names of the strips with that tag, tag text -> number of tags with that text, and
+#strip name -> list of its tag texts.  Only the strips in the sequencer level being edited are indexed, the same strips
+#that are shown in the tag list.  Strips are stored by name and resolved through the sequence editor.
+tag_index = {}
+tag_counts = {}
+strip_tags = {}
+tag_index_key = None
+
+
+def invalidate_tag_index():
+    #Clears the tag index, it will be rebuilt the next time it is needed
+    global tag_index_key
+    tag_index.clear()
+    tag_counts.clear()
+    strip_tags.clear()
+    tag_index_key = None
+
+
+def rebuild_tag_index():
+    """Performs a full rebuild of the tag index from the tags of all sequences in the current sequencer level"""
+
+    global tag_index_key
+    tag_index.clear()
+    tag_counts.clear()
+    strip_tags.clear()
     scene = bpy.context.scene
-    selected_sequences = timeline.current_selected(bpy.context)
-    populate_tags(sequences=selected_sequences, tags=scene.vseqf.selected_tags)
+    sequences = timeline.level_sequences(scene)
+    if sequences is not None:
+        for sequence in sequences:
+            if len(sequence.tags) > 0:
+                tag_index_add(sequence.name, [tag.text for tag in sequence.tags])
+    tag_index_key = timeline.level_key(scene)
+
+
+def ensure_tag_index():
+    #Rebuilds the index if it was invalidated or built for another scene or meta strip
+    if tag_index_key is None or tag_index_key != timeline.level_key(bpy.context.scene):
+        rebuild_tag_index()
+
+
+def tag_index_add(name, texts):
+    tag_index_remove(name)
+    if not texts:
+        return
+    strip_tags[name] = texts
+    for text in texts:
+        tag_counts[text] = tag_counts.get(text, 0) + 1
+        tag_index.setdefault(text, set()).add(name)
+
+
+def tag_index_remove(name):
+    texts = strip_tags.pop(name, None)
+    if texts is None:
+        return
+    for text in texts:
+        count = tag_counts[text] - 1
+        if count > 0:
+            tag_counts[text] = count
+        else:
+            del tag_counts[text]
+    for text in set(texts):
+        names = tag_index[text]
+        names.discard(name)
+        if not names:
+            del tag_index[text]
 
 
-def auto_populate_tags(self, context):
-    populate_tags()
+def index_sequence_tags(sequence):
+    """Updates the tag index entry for a single sequence, used after its tags were changed, or after it was added,
+    duplicated or renamed
+    Argument:
+        sequence: VSE Sequence object to index"""
 
+    if tag_index_key is None:
+        #the index will be built from the current tags when it is next needed
+        return
+    if tag_index_key[1]:
+        #editing inside a meta strip, only the strips in it are indexed
+        sequences = timeline.level_sequences(bpy.context.scene)
+        if sequences is None or sequences.get(sequence.name) is None:
+            return
+    tag_index_add(sequence.name, [tag.text for tag in sequence.tags])
 
-def populate_tags(sequences=False, tags=False):
-    """Iterates through all sequences and stores all tags to the 'tags' property group
-    If no sequences are given, default to all sequences in context.
-    If no tags group is given, default to scene.vseqf.tags"""
 
-    if sequences is False:
-        sequences = timeline.current_sequences(bpy.context)
-    if tags is False:
-        tags = bpy.context.scene.vseqf.tags
+def index_remove_missing(names):
+    """Removes sequences that no longer exist from the tag index
+    Argument:
+        names: iterable of sequence names that may have been deleted or renamed"""
+
+    if tag_index_key is None:
+        return
+    sequences = timeline.level_sequences(bpy.context.scene)
+    for name in names:
+        if name in strip_tags and (sequences is None or sequences.get(name) is None):
+            tag_index_remove(name)
+
+
+def tag_count(text):
+    """Returns the number of tags with the given text on the sequences in the current sequencer level"""
+
+    ensure_tag_index()
+    return tag_counts.get(text, 0)
+
+
+def tagged_sequences(text):
+    """Finds the sequences in the current sequencer level that have a tag, using the tag index
+    Argument:
+        text: String, the tag text to look for
+
+    Returns: List of VSE Sequence objects, sorted by name"""
+
+    ensure_tag_index()
+    names = tag_index.get(text)
+    if not names:
+        return []
+    sequences = timeline.level_sequences(bpy.context.scene)
+    found = []
+    missing = []
+    for name in sorted(names):
+        sequence = sequences.get(name) if sequences is not None else None
+        if sequence is None:
+            missing.append(name)
+        else:
+            found.append(sequence)
+    for name in missing:
+        tag_index_remove(name)
+    return found
+
 
-    temp_tags = set()
-    for sequence in sequences:
+def tokenize_tag_query(query):
+    """Splits a tag query into tokens
+    Argument:
+        query: String, the tag query
+
+    Returns: List of tokens, each an [type, text] list.  Type is one of 'AND', 'OR', 'NOT', '(', ')' or 'TAG'.
+        Words that are not operators are joined with spaces into one tag name, quoted names are used as they are."""
+
+    tokens = []
+    words = []
+
+    def end_words():
+        if words:
+            tokens.append(['TAG', ' '.join(words)])
+            del words[:]
+
+    index = 0
+    while index < len(query):
+        character = query[index]
+        if character.isspace():
+            index = index + 1
+        elif character in '()':
+            end_words()
+            tokens.append([character, character])
+            index = index + 1
+        elif character == '"':
+            end_words()
+            end = query.find('"', index + 1)
+            if end == -1:
+                raise ValueError('Missing closing quote')
+            tokens.append(['TAG', query[index + 1:end]])
+            index = end + 1
+        else:
+            end = index
+            while end < len(query) and not query[end].isspace() and query[end] not in '()"':
+                end = end + 1
+            word = query[index:end]
+            if word.upper() in ['AND', 'OR', 'NOT']:
+                end_words()
+                tokens.append([word.upper(), word])
+            else:
+                words.append(word)
+            index = end
+    end_words()
+    return tokens
+
+
+def parse_tag_query(query):
+    """Parses a boolean tag query like 'interview AND NOT rejected' or '(broll OR cutaway) AND "day 2"'.
+    NOT is applied first, then AND, then OR, use parentheses to change the order.
+    Argument:
+        query: String, the tag query
+
+    Returns: Nested lists, each is ['TAG', name], ['NOT', query], ['AND', query, query] or ['OR', query, query]"""
+
+    tokens = tokenize_tag_query(query)
+    if not tokens:
+        raise ValueError('Query is empty')
+    position = [0]
+
+    def peek():
+        if position[0] < len(tokens):
+            return tokens[position[0]][0]
+        return None
+
+    def take(token_type):
+        token = tokens[position[0]] if position[0] < len(tokens) else None
+        if token is None or token[0] != token_type:
+            found = "'"+token[1]+"'" if token else 'end of query'
+            raise ValueError('Expected '+token_type.lower()+', found '+found)
+        position[0] = position[0] + 1
+        return token
+
+    def parse_or():
+        node = parse_and()
+        while peek() == 'OR':
+            take('OR')
+            node = ['OR', node, parse_and()]
+        return node
+
+    def parse_and():
+        node = parse_not()
+        while peek() == 'AND':
+            take('AND')
+            node = ['AND', node, parse_not()]
+        return node
+
+    def parse_not():
+        token_type = peek()
+        if token_type == 'NOT':
+            take('NOT')
+            return ['NOT', parse_not()]
+        if token_type == '(':
+            take('(')
+            node = parse_or()
+            take(')')
+            return node
+        return ['TAG', take('TAG')[1]]
+
+    node = parse_or()
+    if position[0] < len(tokens):
+        raise ValueError("Unexpected '"+tokens[position[0]][1]+"'")
+    return node
+
+
+def query_tag_names(node):
+    """Finds the tag names used in a parsed tag query
+    Argument:
+        node: parsed query, see parse_tag_query
+
+    Returns: Set of tag name strings"""
+
+    if node[0] == 'TAG':
+        return {node[1]}
+    names = set()
+    for child in node[1:]:
+        names.update(query_tag_names(child))
+    return names
+
+
+def evaluate_tag_query(node):
+    #Returns a [names, inverted] pair, if inverted is True, the result is every strip except the given names.
+    #This keeps NOT from needing a list of every strip unless the whole query is inverted.
+    if node[0] == 'TAG':
+        return [set(tag_index.get(node[1], ())), False]
+    if node[0] == 'NOT':
+        names, inverted = evaluate_tag_query(node[1])
+        return [names, not inverted]
+    left, left_inverted = evaluate_tag_query(node[1])
+    right, right_inverted = evaluate_tag_query(node[2])
+    if node[0] == 'AND':
+        if not left_inverted and not right_inverted:
+            return [left & right, False]
+        if left_inverted and right_inverted:
+            return [left | right, True]
+        if left_inverted:
+            return [right - left, False]
+        return [left - right, False]
+    if not left_inverted and not right_inverted:
+        return [left | right, False]
+    if left_inverted and right_inverted:
+        return [left & right, True]
+    if left_inverted:
+        return [left - right, True]
+    return [right - left, True]
+
+
+def query_tagged_sequences(query, frame_start=None, frame_end=None):
+    """Finds the sequences in the current sequencer level that match a boolean tag query, using the tag index
+    Arguments:
+        query: String, a tag query, see parse_tag_query
+        frame_start: Integer, if given with frame_end, only return sequences with a marker tag named in the query
+            that overlaps this frame range
+        frame_end: Integer, last frame of the range
+
+    Returns: List of VSE Sequence objects, sorted by name.  Raises ValueError if the query cannot be read."""
+
+    node = parse_tag_query(query)
+    ensure_tag_index()
+    names, inverted = evaluate_tag_query(node)
+    sequences = timeline.level_sequences(bpy.context.scene)
+    if sequences is None:
+        return []
+    if inverted:
+        found = [sequence for sequence in sequences if sequence.name not in names]
+        found.sort(key=lambda x: x.name)
+    else:
+        found = []
+        for name in sorted(names):
+            sequence = sequences.get(name)
+            if sequence is not None:
+                found.append(sequence)
+    if frame_start is None or frame_end is None:
+        return found
+
+    #only keep sequences with a marker tag in the frame range
+    query_names = query_tag_names(node)
+    in_range = []
+    for sequence in found:
         for tag in sequence.tags:
-            temp_tags.add(tag.text)
+            if tag.use_offset and tag.text in query_names:
+                tag_start = sequence.frame_start + tag.offset - 1
+                tag_end = tag_start + tag.length
+                if tag_start <= frame_end and tag_end >= frame_start:
+                    in_range.append(sequence)
+                    break
+    return in_range
+
+
+def tag_owner(tag):
+    """Finds the sequence that a tag belongs to
+    Argument:
+        tag: VSEQFTags object
+
+    Returns: VSE Sequence object, or None if the tag is not on a sequence"""
+
     try:
-        tags.clear()
+        path = tag.path_from_id()
+        start = 'sequence_editor.sequences_all["'
+        if not path.startswith(start) or '"].tags[' not in path:
+            return None
+        name = path[len(start):path.rindex('"].tags[')].replace('\\"', '"').replace('\\\\', '\\')
+        return tag.id_data.sequence_editor.sequences_all.get(name)
     except:
-        pass
-    add_tags = sorted(temp_tags)
+        return None
+
+
+def update_tag_list(tags, names, rebuild=False):
+    """Changes a tag list collection to contain the given tag names in sorted order.  Only tags that were added or
+    removed are changed, the remaining items are left in place.
+    Arguments:
+        tags: CollectionProperty of VSEQFTags, items are identified by their name
+        names: iterable of tag text strings
+        rebuild: Boolean, if True, the collection is cleared and every item is added again
+
+    Returns: True if the collection was changed"""
+
+    add_tags = sorted(set(names))
+    if rebuild:
+        try:
+            tags.clear()
+        except:
+            pass
+        for tag in add_tags:
+            new_tag = tags.add()
+            new_tag.name = tag
+        return True
+
+    #remove tags that are no longer used, and duplicates
+    wanted = set(add_tags)
+    found = set()
+    removed = []
+    for index, tag in enumerate(tags):
+        if tag.name in wanted and tag.name not in found:
+            found.add(tag.name)
+        else:
+            removed.append(index)
+    for index in reversed(removed):
+        tags.remove(index)
+    current = [tag.name for tag in tags]
+    if current != sorted(current):
+        #the list was not made by this function, the order cannot be kept
+        return update_tag_list(tags, add_tags, rebuild=True)
+
+    #add the new tags at their sorted position
+    changed = bool(removed)
+    position = 0
     for tag in add_tags:
+        if position < len(current) and current[position] == tag:
+            position = position + 1
+            continue
         new_tag = tags.add()
         new_tag.name = tag
+        last = len(tags) - 1
+        if position != last:
+            tags.move(last, position)
+        current.insert(position, tag)
+        position = position + 1
+        changed = True
+    return changed
+
+
+def populate_selected_tags(rebuild=False):
+    scene = bpy.context.scene
+    selected_sequences = timeline.current_selected(bpy.context)
+    populate_tags(sequences=selected_sequences, tags=scene.vseqf.selected_tags, rebuild=rebuild)
+
+
+def auto_populate_tags(self, context):
+    #tag text was changed, update the tag index entry of the sequence that has this tag
+    sequence = tag_owner(self)
+    if sequence is not None:
+        index_sequence_tags(sequence)
+    else:
+        invalidate_tag_index()
+    populate_tags()
+
+
+def populate_tags(sequences=False, tags=False, rebuild=False):
+    """Stores all tags of the given sequences to the 'tags' property group, only changed tags are added or removed
+    If no sequences are given, default to all sequences in context, found with the tag index.
+    If no tags group is given, default to scene.vseqf.tags, and keep the same tag active if it still exists.
+    If rebuild is True, the tags group is cleared and filled again."""
+
+    active_name = None
+    if tags is False:
+        vseqf_settings = bpy.context.scene.vseqf
+        tags = vseqf_settings.tags
+        if 0 <= vseqf_settings.tag_index < len(tags):
+            active_name = tags[vseqf_settings.tag_index].name
+    else:
+        vseqf_settings = None
+
+    if sequences is False:
+        ensure_tag_index()
+        temp_tags = tag_index.keys()
+    else:
+        temp_tags = set()
+        for sequence in sequences:
+            for tag in sequence.tags:
+                temp_tags.add(tag.text)
+    changed = update_tag_list(tags, temp_tags, rebuild=rebuild)
+    if changed and vseqf_settings is not None and active_name is not None:
+        active_index = tags.find(active_name)
+        if active_index >= 0:
+            vseqf_settings.tag_index = active_index
+        elif vseqf_settings.tag_index >= len(tags):
+            vseqf_settings.tag_index = max(len(tags) - 1, 0)
 
 
 class VSEQFQuickTagsStripMarkerMenu(bpy.types.Menu):
@@ -149,6 +554,7 @@ class VSEQF_PT_QuickTagsPanel(bpy.types.Panel):
         layout = self.layout
         row = layout.row()
         row.label(text='All Tags:')
+        row.operator('vseqf.quicktags_refresh', text='', icon='FILE_REFRESH')
         row = layout.row()
         row.template_list("VSEQF_UL_QuickTagListAll", "", scene.vseqf, 'tags', scene.vseqf, 'tag_index', rows=3)
         row = layout.row()
@@ -164,6 +570,9 @@ class VSEQF_PT_QuickTagsPanel(bpy.types.Panel):
             else:
                 row.enabled = False
             row.operator('vseqf.quicktags_add', text='Add Tag To Selected Strips').text = text
+        row = layout.row(align=True)
+        row.prop(scene.vseqf, 'tag_query', text='')
+        row.operator('vseqf.quicktags_query', text='Select Query').query = scene.vseqf.tag_query
         row = layout.row()
         row.separator()
 
@@ -243,6 +652,7 @@ class VSEQFQuickTagsClear(bpy.types.Operator):
             bpy.ops.ed.undo_push()
             for sequence in sequences:
                 sequence.tags.clear()
+                index_sequence_tags(sequence)
             populate_selected_tags()
             populate_tags()
         else:
@@ -251,10 +661,26 @@ class VSEQFQuickTagsClear(bpy.types.Operator):
                 return {'FINISHED'}
             bpy.ops.ed.undo_push()
             sequence.tags.clear()
+            index_sequence_tags(sequence)
             populate_tags()
         return{'FINISHED'}
 
 
+class VSEQFQuickTagsRefresh(bpy.types.Operator):
+    """Rebuilds the tag index and the list of all tags from the tags on the sequences"""
+
+    bl_idname = 'vseqf.quicktags_refresh'
+    bl_label = 'VSEQF Quick Tags Refresh'
+    bl_description = 'Rebuild the list of all tags'
+
+    def execute(self, context):
+        del context
+        invalidate_tag_index()
+        populate_selected_tags(rebuild=True)
+        populate_tags(rebuild=True)
+        return{'FINISHED'}
+
+
 class VSEQFQuickTagsSelect(bpy.types.Operator):
     """Selects sequences with the given tag name
     Argument:
@@ -270,14 +696,11 @@ class VSEQFQuickTagsSelect(bpy.types.Operator):
         bpy.ops.ed.undo_push()
         text = self.text
         new_active = None
-        sequences = timeline.current_sequences(context)
-        for sequence in sequences:
+        for sequence in timeline.current_selected(context):
             sequence.select = False
-            for tag in sequence.tags:
-                if tag.text == text:
-                    sequence.select = True
-                    new_active = sequence
-                    break
+        for sequence in tagged_sequences(text):
+            sequence.select = True
+            new_active = sequence
         active = timeline.current_active(context)
         if not active and not active.select and new_active:
             context.scene.sequence_editor.active_strip = new_active
@@ -286,6 +709,58 @@ class VSEQFQuickTagsSelect(bpy.types.Operator):
         return{'FINISHED'}
 
 
+class VSEQFQuickTagsQuery(bpy.types.Operator):
+    """Selects sequences matching a boolean tag query
+    Operator variables:
+        query: String, tag names combined with AND, OR, NOT and parentheses, names with spaces or operator words can be quoted
+        range: which sequences are kept:
+            ALL: every matching sequence
+            PREVIEW: matching sequences with a marker tag from the query in the preview range, or the scene range
+            CUSTOM: matching sequences with a marker tag from the query between frame_start and frame_end
+        extend: if True, add to the current selection instead of replacing it"""
+
+    bl_idname = 'vseqf.quicktags_query'
+    bl_label = 'VSEQF Quick Tags Query'
+    bl_description = 'Select all sequences matching a tag query, like: interview AND NOT rejected'
+
+    query: bpy.props.StringProperty(name='Query', default='')
+    range: bpy.props.EnumProperty(name='Range', items=[("ALL", "All", "", 1), ("PREVIEW", "Preview Range", "", 2), ("CUSTOM", "Custom", "", 3)], default='ALL')
+    frame_start: bpy.props.IntProperty(name='Start Frame', default=1)
+    frame_end: bpy.props.IntProperty(name='End Frame', default=250)
+    extend: bpy.props.BoolProperty(name='Extend Selection', default=False)
+
+    def get_range(self, context):
+        scene = context.scene
+        if self.range == 'PREVIEW':
+            if scene.use_preview_range:
+                return scene.frame_preview_start, scene.frame_preview_end
+            return scene.frame_start, scene.frame_end
+        if self.range == 'CUSTOM':
+            return self.frame_start, self.frame_end
+        return None, None
+
+    def execute(self, context):
+        frame_start, frame_end = self.get_range(context)
+        try:
+            found = query_tagged_sequences(self.query, frame_start=frame_start, frame_end=frame_end)
+        except ValueError as error:
+            self.report({'WARNING'}, 'Could not read tag query: '+str(error))
+            return {'CANCELLED'}
+        bpy.ops.ed.undo_push()
+        if not self.extend:
+            for sequence in timeline.current_selected(context):
+                sequence.select = False
+        for sequence in found:
+            sequence.select = True
+        if found:
+            active = timeline.current_active(context)
+            if not active or not active.select:
+                context.scene.sequence_editor.active_strip = found[-1]
+        context.scene.vseqf.tag_query = self.query
+        self.report({'INFO'}, 'Selected '+str(len(found))+' strips')
+        return{'FINISHED'}
+
+
 class VSEQFQuickTagsRemoveFrom(bpy.types.Operator):
     """Removes a tag from a specified sequence
     Argument:
@@ -301,12 +776,13 @@ class VSEQFQuickTagsRemoveFrom(bpy.types.Operator):
             text, sequence_name = self.tag.split('\n')
             if text and sequence_name:
                 bpy.ops.ed.undo_push()
-                sequences = timeline.current_sequences(context)
-                for sequence in sequences:
-                    if sequence.name == sequence_name:
-                        for index, tag in reversed(list(enumerate(sequence.tags))):
-                            if tag.text == text:
-                                sequence.tags.remove(index)
+                sequences = timeline.level_sequences(context.scene)
+                sequence = sequences.get(sequence_name) if sequences is not None else None
+                if sequence is not None:
+                    for index, tag in reversed(list(enumerate(sequence.tags))):
+                        if tag.text == text:
+                            sequence.tags.remove(index)
+                    index_sequence_tags(sequence)
 
         populate_tags()
         return{'FINISHED'}
@@ -327,6 +803,7 @@ class VSEQFQuickTagsRemoveMarker(bpy.types.Operator):
             if 0 <= self.index < len(active.tags):
                 bpy.ops.ed.undo_push()
                 active.tags.remove(self.index)
+                index_sequence_tags(active)
                 populate_selected_tags()
                 populate_tags()
                 context.scene.frame_current = context.scene.frame_current  #hacky way to force update scene, but it works.
@@ -353,6 +830,7 @@ class VSEQFQuickTagsRemove(bpy.types.Operator):
             for index, tag in reversed(list(enumerate(sequence.tags))):
                 if tag.text == self.text:
                     sequence.tags.remove(index)
+            index_sequence_tags(sequence)
         context.scene.frame_current = context.scene.frame_current  #hacky way to force update scene, but it works.
         populate_selected_tags()
         populate_tags()
@@ -382,6 +860,7 @@ class VSEQFQuickTagsAdd(bpy.types.Operator):
                 if not tag_found:
                     tag = sequence.tags.add()
                     tag.text = text
+                    index_sequence_tags(sequence)
         return{'FINISHED'}
 
 
@@ -409,6 +888,7 @@ class VSEQFQuickTagsAddMarker(bpy.types.Operator):
                 tag.text = text
                 tag.use_offset = True
                 tag.offset = offset
+                index_sequence_tags(sequence)
         return{'FINISHED'}
 
 
@@ -434,6 +914,7 @@ class VSEQFQuickTagsAddActive(bpy.types.Operator):
             if not tag_found:
                 tag = sequence.tags.add()
                 tag.text = text
+                index_sequence_tags(sequence)
                 for index, tag in enumerate(sequence.tags):
                     if tag.text == text:
                         context.scene.vseqf.strip_tag_index = index
@@ -135,31 +135,34 @@ def three_point_draw_callback(self, context):
     width = context.region.width
     height = context.region.height
 
+    overlay = vseqf.OverlayBatch()
+
     #draw in/out bars
-    vseqf.draw_rect(0, height - double_scale, width, double_scale, colorbg)
-    vseqf.draw_rect(0, height - half_scale - 2, width, 4, colormg)
-    vseqf.draw_rect(0, height - scale - half_scale - 2, width, 4, colormg)
-    vseqf.draw_rect(0, height - scale - 1, width, 2, colormg)
+    overlay.add_rect(0, height - double_scale, width, double_scale, color=colorbg)
+    overlay.add_rect(0, height - half_scale - 2, width, 4, color=colormg)
+    overlay.add_rect(0, height - scale - half_scale - 2, width, 4, color=colormg)
+    overlay.add_rect(0, height - scale - 1, width, 2, color=colormg)
 
     #draw in/out icons
     in_x = self.in_percent * width
-    vseqf.draw_rect(in_x, height - scale, quarter_scale, scale, colorfg)
-    vseqf.draw_tri((in_x, height - half_scale), (in_x + half_scale, height), (in_x + half_scale, height - scale), colorfg)
+    overlay.add_rect(in_x, height - scale, quarter_scale, scale, color=colorfg)
+    overlay.add_tri((in_x, height - half_scale), (in_x + half_scale, height), (in_x + half_scale, height - scale), color=colorfg)
 
     if self.in_percent <= .5:
         in_text_x = in_x + scale
     else:
         in_text_x = 0 + half_scale
-    vseqf.draw_text(in_text_x, height - scale + 2, scale - 2, "In: "+str(self.in_frame), colorfg)
+    overlay.add_text(in_text_x, height - scale + 2, scale - 2, "In: "+str(self.in_frame), color=colorfg)
 
     out_x = self.out_percent * width
-    vseqf.draw_rect(out_x - quarter_scale, height - double_scale, quarter_scale, scale, colorfg)
-    vseqf.draw_tri((out_x, height - half_scale - scale), (out_x - half_scale, height - scale), (out_x - half_scale, height - double_scale), colorfg)
+    overlay.add_rect(out_x - quarter_scale, height - double_scale, quarter_scale, scale, color=colorfg)
+    overlay.add_tri((out_x, height - half_scale - scale), (out_x - half_scale, height - scale), (out_x - half_scale, height - double_scale), color=colorfg)
     if self.out_percent >= .5:
         out_text_x = 0 + half_scale
     else:
         out_text_x = out_x + half_scale
-    vseqf.draw_text(out_text_x, height - double_scale + 2, scale - 2, "Length: "+str(self.out_frame - self.in_frame), colorfg)
+    overlay.add_text(out_text_x, height - double_scale + 2, scale - 2, "Length: "+str(self.out_frame - self.in_frame), color=colorfg)
+    overlay.draw(blend=False)
 
 
 class VSEQF_PT_ThreePointBrowserPanel(bpy.types.Panel):
@@ -425,8 +428,7 @@ class VSEQFThreePointImport(bpy.types.Operator):
                     context.scene.frame_current = move_frame
                     bpy.ops.vseqf.cut(type='INSERT_ONLY', use_insert=True, insert=move_forward, use_all=True, all=True)
                     context.scene.frame_current = old_current
-                for child in children:
-                    child.parent = movie_sequence.name
+                parenting.add_children(movie_sequence, children)
             elif self.type == 'end':
                 import_pos = timeline.find_sequences_end(sequences)
                 frame_start = import_pos - frame_in
@@ -454,7 +456,7 @@ class VSEQFThreePointImport(bpy.types.Operator):
                 if sound_sequence.frame_final_end > movie_sequence.frame_final_end:
                     sound_sequence.frame_final_end = movie_sequence.frame_final_end
                 if context.scene.vseqf.autoparent:
-                    sound_sequence.parent = movie_sequence.name
+                    parenting.add_children(movie_sequence, [sound_sequence])
             if context.scene.vseqf.snap_new_end:
                 context.scene.frame_current = movie_sequence.frame_final_end
 
@@ -1,8 +1,39 @@
 import bpy
+from bisect import bisect_left, bisect_right, insort
 from . import vseqf
 from . import parenting
 
 
+#Strip span index, stores the position of every strip in the current sequence list, split up by channel, so timeline
+#area queries only need to look at the strips near the queried range instead of iterating over every sequence.
+#Only names are stored since strip references become invalid after undo.
+span_starts = {}  #channel: sorted list of [frame_final_start, name]
+span_lengths = {}  #channel: longest strip length ever indexed in the channel, used to bound the search range
+span_positions = {}  #name: [channel, frame_final_start, frame_final_end]
+span_effects = {}  #name: list of names of effect strips that use this strip as an input
+span_index_key = None
+
+#Neighbour index, used by find_close_sequence.  Strips are stored by their position in the indexed sequence list,
+#entries are [frame, position] so strips on the same frame are sorted in list order, like the min() calls used before.
+#Strips are found again by position in the list given to find_close_sequence, their names are checked when they are used.
+neighbour_index_key = None  #level_key of the indexed sequences, and the number of sequences
+neighbour_names = []  #position: name
+neighbour_orders = {}  #name: position
+neighbour_positions = []  #position: [channel, frame_final_start, frame_final_end]
+neighbour_effects = {}  #position: list of positions of effects that use this strip as input_1
+neighbour_starts = []  #sorted list of [frame_final_start, position]
+neighbour_ends = []  #sorted list of [frame_final_end, position]
+neighbour_channel_starts = {}  #channel: sorted list of [frame_final_start, position]
+neighbour_channel_ends = {}  #channel: sorted list of [frame_final_end, position]
+
+#Sorted frame indexes used to jump between strip edges and markers
+edge_frames = []  #sorted list of the start and end frames of every strip in the top level of the sequencer
+edge_index_key = None
+marker_frames = []  #sorted list of [frame, index in scene.timeline_markers]
+marker_index_frames = []  #frame of every marker in scene.timeline_markers order, when the index was built
+marker_index_key = None
+
+
 #Effect manipulation and cleanup
 def effect_children(sequence, to_check):
     effects = []
@@ -21,7 +52,9 @@ def fix_effect(effect, apply_from, apply_to, to_check):
     sub_effects = effect_children(effect, to_check)
     if not hasattr(effect, 'input_2'):
         #just a one-input effect, just copy it to the new sequence and check its children
-        new_effect = copy_effect(effect, apply_to)
+        new_effect = copy_effect(effect, apply_to, save_selection=False)
+        #the new effect may need to be copied again if the strip it is on gets cut again
+        to_check.append(new_effect)
         for sub_effect in sub_effects:
             fix_effect(sub_effect, effect, new_effect, to_check)
     else:
@@ -38,14 +71,114 @@ def fix_effect(effect, apply_from, apply_to, to_check):
         effect.channel = original_channel
 
 
-def copy_effect(effect, copy_to):
-    #copies a given single-input effect to the given sequence
-    old_selects = []
-    sequences = current_sequences(bpy.context)
-    for sequence in sequences:
-        if sequence.select:
-            old_selects.append(sequence)
-            sequence.select = False
+#Properties that are set up by new_effect or describe the position of a strip, these are not copied between effects
+effect_copy_skip = {'rna_type', 'name', 'type', 'channel', 'frame_start', 'frame_final_start', 'frame_final_end', 'frame_final_duration', 'frame_duration', 'frame_offset_start', 'frame_offset_end', 'frame_still_start', 'frame_still_end', 'input_1', 'input_2', 'input_count', 'select', 'select_left_handle', 'select_right_handle'}
+
+
+def sequences_collection(context):
+    #returns the bpy collection that new strips should be added to, the sequences of the current meta strip if in one
+    sequence_editor = context.scene.sequence_editor
+    if len(sequence_editor.meta_stack) > 0:
+        return sequence_editor.meta_stack[-1].sequences
+    return sequence_editor.sequences
+
+
+def copy_properties(copy_from, copy_to, skip=('rna_type', )):
+    #copies all editable simple properties from one bpy struct to another of the same type, and recurses into pointer properties like transform and crop
+    for prop in copy_from.bl_rna.properties:
+        identifier = prop.identifier
+        if identifier in skip:
+            continue
+        if prop.type == 'POINTER':
+            sub_from = getattr(copy_from, identifier)
+            sub_to = getattr(copy_to, identifier)
+            if prop.is_readonly and sub_from is not None and sub_to is not None and not isinstance(sub_from, bpy.types.ID):
+                copy_properties(sub_from, sub_to)
+            elif not prop.is_readonly:
+                try:
+                    setattr(copy_to, identifier, sub_from)
+                except:
+                    pass
+        elif prop.type != 'COLLECTION' and not prop.is_readonly:
+            try:
+                setattr(copy_to, identifier, getattr(copy_from, identifier))
+            except:
+                pass
+
+
+def copy_animation(context, copy_from, copy_to):
+    #copies the animation curves of one strip to another strip
+    animation_data = context.scene.animation_data
+    if not animation_data or not animation_data.action:
+        return
+    fcurves = animation_data.action.fcurves
+    path_from = copy_from.path_from_id()
+    path_to = copy_to.path_from_id()
+    to_copy = []
+    for curve in fcurves:
+        if curve.data_path.startswith(path_from + '.'):
+            to_copy.append(curve)
+    for curve in to_copy:
+        data_path = path_to + curve.data_path[len(path_from):]
+        new_curve = fcurves.find(data_path, index=curve.array_index)
+        if new_curve is None:
+            new_curve = fcurves.new(data_path, index=curve.array_index, action_group=curve.group.name if curve.group else '')
+        new_curve.extrapolation = curve.extrapolation
+        count = len(curve.keyframe_points)
+        new_curve.keyframe_points.add(count - len(new_curve.keyframe_points))
+        for attribute in ('co', 'handle_left', 'handle_right'):
+            values = [0.0] * (count * 2)
+            curve.keyframe_points.foreach_get(attribute, values)
+            new_curve.keyframe_points.foreach_set(attribute, values)
+        for point, new_point in zip(curve.keyframe_points, new_curve.keyframe_points):
+            new_point.interpolation = point.interpolation
+            new_point.handle_left_type = point.handle_left_type
+            new_point.handle_right_type = point.handle_right_type
+            new_point.easing = point.easing
+        new_curve.update()
+
+
+def duplicate_effect(effect, copy_to):
+    """Creates a copy of a single-input effect applied to a different strip, without using operators
+    Arguments:
+        effect: VSE Sequence object, the effect to copy
+        copy_to: VSE Sequence object that the new effect will use as its input
+
+    Returns: The new VSE Sequence object, or None if the effect could not be created"""
+
+    context = bpy.context
+    try:
+        new_effect = sequences_collection(context).new_effect(name=effect.name, type=effect.type, channel=effect.channel, frame_start=copy_to.frame_final_start, frame_end=copy_to.frame_final_end, seq1=copy_to)
+    except:
+        return None
+    copy_properties(effect, new_effect, skip=effect_copy_skip)
+    for modifier in effect.modifiers:
+        new_modifier = new_effect.modifiers.new(name=modifier.name, type=modifier.type)
+        copy_properties(modifier, new_modifier, skip={'rna_type', 'name', 'type'})
+    copy_animation(context, effect, new_effect)
+    if new_effect.channel != effect.channel:
+        new_effect.channel = effect.channel
+    new_effect.select = False
+    return new_effect
+
+
+def copy_effect(effect, copy_to, save_selection=True):
+    """Copies a given single-input effect to the given sequence
+    Arguments:
+        effect: VSE Sequence object, the effect to copy
+        copy_to: VSE Sequence object to apply the new effect to
+        save_selection: Boolean, if False, the caller must have deselected all strips and restore the selection after,
+            this is only needed if the operator fallback is used.
+
+    Returns: The new VSE Sequence object"""
+
+    new_effect = duplicate_effect(effect, copy_to)
+    if new_effect is not None:
+        return new_effect
+
+    #fall back to duplicating with operators
+    if save_selection:
+        old_selects = deselect_sequences(current_sequences(bpy.context))
     effect.select = True
     bpy.ops.sequencer.duplicate()
     new_effect = current_selected(bpy.context)[0]
@@ -56,22 +189,474 @@ def copy_effect(effect, copy_to):
     new_effect.select = False
     effect.select = False
     copy_to.select = False
-    for sequence in old_selects:
-        sequence.select = True
+    if save_selection:
+        for sequence in old_selects:
+            sequence.select = True
     return new_effect
 
 
+def deselect_sequences(sequences):
+    #deselects the given strips, returns a list of the strips that were selected
+    old_selects = []
+    for sequence in sequences:
+        if sequence.select:
+            old_selects.append(sequence)
+            sequence.select = False
+    return old_selects
+
+
 def fix_effects(cut_pairs, sequences):
+    """Makes the effects of strips that were cut apply to both sides of the cuts, all cuts are processed at once
+    Arguments:
+        cut_pairs: list of [left, right] VSE Sequence object pairs, as returned by cuts.vseqf_cut
+        sequences: list of VSE Sequence objects to search for effects"""
+
     effects = []
     for sequence in sequences:
         if hasattr(sequence, 'input_1'):
             effects.append(sequence)
+    if not effects:
+        return
+    #selection is only changed if an effect needs to be copied with operators, so it is saved once for every cut
+    old_selects = deselect_sequences(sequences)
     for cut_pair in cut_pairs:
         left, right = cut_pair
         if left and right:
-            left_effects = effect_children(left, effects)
-            for effect in left_effects:
+            #effects are found as each pair is fixed, so strips cut more than once pick up the effects copied to them
+            for effect in effect_children(left, effects):
                 fix_effect(effect, left, right, effects)
+    for sequence in old_selects:
+        sequence.select = True
+    invalidate_span_index()
+
+
+#Strip span index functions
+def get_span_index_key(context):
+    return level_key(context.scene)
+
+
+def invalidate_span_index():
+    """Clears the strip span index, it will be rebuilt the next time it is needed.  Should be called whenever strips
+    are added, removed or moved without using update_span_index"""
+
+    global span_index_key
+    span_index_key = None
+    span_starts.clear()
+    span_lengths.clear()
+    span_positions.clear()
+    span_effects.clear()
+    invalidate_neighbour_index()
+
+
+def span_index_add(name, channel, start, end):
+    span_positions[name] = [channel, start, end]
+    if channel not in span_starts:
+        span_starts[channel] = []
+        span_lengths[channel] = 0
+    insort(span_starts[channel], [start, name])
+    length = end - start
+    if length > span_lengths[channel]:
+        span_lengths[channel] = length
+
+
+def span_index_remove(name):
+    position = span_positions.pop(name, None)
+    if position is None:
+        return
+    channel, start, end = position
+    starts = span_starts[channel]
+    index = bisect_left(starts, [start, name])
+    if index < len(starts) and starts[index][1] == name:
+        del starts[index]
+
+
+def rebuild_span_index(context):
+    global span_index_key
+    invalidate_span_index()
+    sequences = current_sequences(context)
+    for sequence in sequences:
+        #the channel lists are sorted once all strips are added
+        name = sequence.name
+        channel = sequence.channel
+        start = sequence.frame_final_start
+        end = sequence.frame_final_end
+        span_positions[name] = [channel, start, end]
+        if channel not in span_starts:
+            span_starts[channel] = []
+            span_lengths[channel] = 0
+        span_starts[channel].append([start, name])
+        if end - start > span_lengths[channel]:
+            span_lengths[channel] = end - start
+        if hasattr(sequence, 'input_1'):
+            for input_name in ['input_1', 'input_2']:
+                input_sequence = getattr(sequence, input_name, None)
+                if input_sequence:
+                    if input_sequence.name not in span_effects:
+                        span_effects[input_sequence.name] = []
+                    span_effects[input_sequence.name].append(sequence.name)
+    for starts in span_starts.values():
+        starts.sort()
+    span_index_key = get_span_index_key(context)
+
+
+def ensure_span_index(context=None):
+    #rebuilds the span index if it has been invalidated or the scene/meta level has changed
+    if context is None:
+        context = bpy.context
+    if span_index_key is None or span_index_key != get_span_index_key(context):
+        rebuild_span_index(context)
+
+
+def update_span_index(sequence):
+    """Updates the stored position of a strip that was just moved, along with any effects applied to it
+    Arguments:
+        sequence: VSE Sequence object that was moved"""
+
+    update_neighbour_index(sequence)
+    if span_index_key is None:
+        #index is not built, nothing to update
+        return
+    name = sequence.name
+    if name not in span_positions:
+        #strip isnt in the index, it may have been added since, so the whole index is outdated
+        invalidate_span_index()
+        return
+    span_index_remove(name)
+    span_index_add(name, sequence.channel, sequence.frame_final_start, sequence.frame_final_end)
+    for effect_name in span_effects.get(name, []):
+        effect = parenting.lookup_sequence(effect_name)
+        if effect is not None:
+            span_index_remove(effect_name)
+            span_index_add(effect_name, effect.channel, effect.frame_final_start, effect.frame_final_end)
+
+
+def find_spans(left, right, bottom=1, top=-1):
+    """Finds all indexed strips that may touch the given frame range, using the current strip span index
+    Arguments:
+        left: Starting frame of the range
+        right: Ending frame of the range
+        bottom: Lowest channel to search
+        top: Highest channel to search, set to -1 for infinite range
+
+    Returns: A list of [name, channel, frame_final_start, frame_final_end] lists for every strip with a start at or
+        before 'right' and an end at or after 'left', ordered by channel and start frame"""
+
+    ensure_span_index()
+    found = []
+    for channel in sorted(span_starts.keys()):
+        if channel < bottom or (top != -1 and channel > top):
+            continue
+        starts = span_starts[channel]
+        #any strip ending after left must start after left minus the longest strip length in this channel
+        first = bisect_left(starts, [left - span_lengths[channel]])
+        last = bisect_left(starts, [right + 1])
+        for start, name in starts[first:last]:
+            position = span_positions[name]
+            if position[2] >= left:
+                found.append([name, channel, position[1], position[2]])
+    return found
+
+
+def find_span_sequences(left, right, bottom=1, top=-1):
+    #same as find_spans, but returns a list of [sequence, frame_final_start, frame_final_end] lists
+    sequences = []
+    for name, channel, start, end in find_spans(left, right, bottom, top):
+        sequence = parenting.lookup_sequence(name)
+        if sequence is not None:
+            sequences.append([sequence, start, end])
+    return sequences
+
+
+def find_free_channel(left, right, channel, omit):
+    """Finds the lowest channel at or above a given channel where a frame range is not filled, using the strip span
+    index.  Same as increasing the channel until sequencer_area_filled returns False, but with a single index search.
+    Arguments:
+        left: Starting frame of the area to check
+        right: Ending frame of the area to check
+        channel: Lowest channel to check
+        omit: List of sequences to ignore
+
+    Returns: Integer channel number"""
+
+    omit_names = [sequence.name for sequence in omit]
+    used = set()
+    for name, span_channel, start, end in find_spans(left, right, channel):
+        if name not in omit_names:
+            if (start >= left and start < right) or (end > left and end <= right) or (start <= left and end >= right):
+                used.add(span_channel)
+    while channel in used:
+        channel = channel + 1
+    return channel
+
+
+def sequences_under_frame(frame):
+    """Finds all strips in the current sequence list that are visible on a frame, equivalent to checking under_cursor
+    on every strip
+    Arguments:
+        frame: Integer, the frame number
+
+    Returns: A list of VSE Sequence objects"""
+
+    under = []
+    if span_index_key is None or span_index_key != get_span_index_key(bpy.context):
+        #building the index costs more than checking every strip once, only use it if it is already built
+        for sequence in current_sequences(bpy.context):
+            if under_cursor(sequence, frame):
+                under.append(sequence)
+        return under
+    for sequence, start, end in find_span_sequences(frame, frame):
+        if start < frame and end > frame:
+            under.append(sequence)
+    return under
+
+
+#Neighbour index functions
+def invalidate_neighbour_index():
+    """Clears the neighbour index, it will be rebuilt the next time find_close_sequence is used.  Should be called when
+    an operator using find_close_sequence finishes"""
+
+    global neighbour_index_key
+    neighbour_index_key = None
+    neighbour_names.clear()
+    neighbour_orders.clear()
+    neighbour_positions.clear()
+    neighbour_effects.clear()
+    neighbour_starts.clear()
+    neighbour_ends.clear()
+    neighbour_channel_starts.clear()
+    neighbour_channel_ends.clear()
+
+
+def neighbour_index_add(position, channel, start, end):
+    neighbour_positions[position] = [channel, start, end]
+    insort(neighbour_starts, [start, position])
+    insort(neighbour_ends, [end, position])
+    if channel not in neighbour_channel_starts:
+        neighbour_channel_starts[channel] = []
+        neighbour_channel_ends[channel] = []
+    insort(neighbour_channel_starts[channel], [start, position])
+    insort(neighbour_channel_ends[channel], [end, position])
+
+
+def neighbour_index_remove(position):
+    channel, start, end = neighbour_positions[position]
+    for entries, frame in ((neighbour_starts, start), (neighbour_ends, end), (neighbour_channel_starts[channel], start), (neighbour_channel_ends[channel], end)):
+        index = bisect_left(entries, [frame, position])
+        if index < len(entries) and entries[index] == [frame, position]:
+            del entries[index]
+
+
+def get_neighbour_index_key(sequences):
+    return (level_key(bpy.context.scene), len(sequences))
+
+
+def ensure_neighbour_index(sequences):
+    """Builds the neighbour index for a list of sequences if it is not already built for the current sequencer level.
+    Arguments:
+        sequences: list of VSE Sequence objects in the current sequencer level"""
+
+    global neighbour_index_key
+    key = get_neighbour_index_key(sequences)
+    if neighbour_index_key is not None and neighbour_index_key == key:
+        return
+    invalidate_neighbour_index()
+    starts = []
+    ends = []
+    for position, sequence in enumerate(sequences):
+        channel = sequence.channel
+        start = sequence.frame_final_start
+        end = sequence.frame_final_end
+        neighbour_names.append(sequence.name)
+        neighbour_orders[sequence.name] = position
+        neighbour_positions.append([channel, start, end])
+        starts.append([start, position])
+        ends.append([end, position])
+        if channel not in neighbour_channel_starts:
+            neighbour_channel_starts[channel] = []
+            neighbour_channel_ends[channel] = []
+        neighbour_channel_starts[channel].append([start, position])
+        neighbour_channel_ends[channel].append([end, position])
+    for position, sequence in enumerate(sequences):
+        if hasattr(sequence, 'input_1') and sequence.input_1:
+            input_position = neighbour_orders.get(sequence.input_1.name)
+            if input_position is not None:
+                if input_position not in neighbour_effects:
+                    neighbour_effects[input_position] = []
+                neighbour_effects[input_position].append(position)
+    neighbour_starts.extend(sorted(starts))
+    neighbour_ends.extend(sorted(ends))
+    for channel in neighbour_channel_starts:
+        neighbour_channel_starts[channel].sort()
+        neighbour_channel_ends[channel].sort()
+    neighbour_index_key = key
+
+
+def update_neighbour_index(sequence):
+    #updates the stored position of a strip and its effects in the neighbour index after it was moved
+    if neighbour_index_key is None:
+        return
+    position = neighbour_orders.get(sequence.name)
+    if position is None:
+        return
+    neighbour_index_remove(position)
+    neighbour_index_add(position, sequence.channel, sequence.frame_final_start, sequence.frame_final_end)
+    effect_positions = neighbour_effects.get(position)
+    if effect_positions:
+        sequences = level_sequences(bpy.context.scene)
+        for effect_position in effect_positions:
+            effect = sequences.get(neighbour_names[effect_position]) if sequences else None
+            if effect is None:
+                invalidate_neighbour_index()
+                return
+            neighbour_index_remove(effect_position)
+            neighbour_index_add(effect_position, effect.channel, effect.frame_final_start, effect.frame_final_end)
+
+
+def neighbour_sequence(sequences, position):
+    """Finds the strip stored at a position in the neighbour index
+    Arguments:
+        sequences: list of VSE Sequence objects that the index was built from
+        position: Integer position in the index
+
+    Returns: VSE Sequence object, raises LookupError if the strips have changed since the index was built"""
+
+    sequence = sequences[position]
+    if sequence.name != neighbour_names[position]:
+        raise LookupError(sequence.name)
+    return sequence
+
+
+def walk_neighbours(sequences, entries, index, step, check):
+    """Walks through a sorted neighbour list from an index and returns the first sequence passing a check.  When
+    walking backwards, the first entry in list order is returned out of the entries on the best frame.
+    Arguments:
+        sequences: list of VSE Sequence objects that the index was built from
+        entries: sorted list of [frame, position]
+        index: index to start at
+        step: 1 to walk forward, -1 to walk backward
+        check: function taking a position, returns True if the strip at that position can be returned
+
+    Returns: VSE Sequence object, or None"""
+
+    while 0 <= index < len(entries):
+        frame, position = entries[index]
+        if check(position):
+            if step < 0:
+                #check the other strips on this frame, in list order
+                for other_frame, other_position in entries[bisect_left(entries, [frame]):index]:
+                    if check(other_position):
+                        position = other_position
+                        break
+            return neighbour_sequence(sequences, position)
+        index = index + step
+    return None
+
+
+#Edge and marker index functions
+def invalidate_edge_index():
+    """Clears the strip edge index, it will be rebuilt the next time it is needed.  Should be called whenever strips
+    may have been changed"""
+
+    global edge_index_key
+    edge_index_key = None
+    edge_frames.clear()
+
+
+def ensure_edge_index(scene):
+    global edge_index_key
+    if edge_index_key == scene.name:
+        return
+    edge_frames.clear()
+    if scene.sequence_editor:
+        for sequence in scene.sequence_editor.sequences:
+            edge_frames.append(sequence.frame_final_start)
+            edge_frames.append(sequence.frame_final_end)
+    edge_frames.sort()
+    edge_index_key = scene.name
+
+
+def find_edge_frame(scene, frame, direction):
+    """Finds the closest strip edge in the top level of the sequencer in the given direction, using a sorted index
+    Arguments:
+        scene: the scene to search
+        frame: Integer frame to search from
+        direction: String, 'next' or 'previous'
+
+    Returns: Integer frame number, or None if none found"""
+
+    ensure_edge_index(scene)
+    if direction == 'next':
+        index = bisect_right(edge_frames, frame)
+        if index < len(edge_frames):
+            return edge_frames[index]
+    else:
+        index = bisect_left(edge_frames, frame)
+        if index > 0:
+            return edge_frames[index - 1]
+    return None
+
+
+def invalidate_marker_index():
+    global marker_index_key
+    marker_index_key = None
+    marker_frames.clear()
+    marker_index_frames.clear()
+
+
+def ensure_marker_index(scene):
+    #Markers are not always covered by depsgraph updates, so the index is checked against the frames of all markers
+    #each time.  Reading the frames in bulk is cheap, sorting them is what the index saves.
+    global marker_index_key
+    markers = scene.timeline_markers
+    frames = [0] * len(markers)
+    markers.foreach_get('frame', frames)
+    if marker_index_key == scene.name and frames == marker_index_frames:
+        return
+    marker_frames.clear()
+    for index, marker_frame in enumerate(frames):
+        marker_frames.append([marker_frame, index])
+    marker_frames.sort()
+    marker_index_frames[:] = frames
+    marker_index_key = scene.name
+
+
+def find_marker_frame(scene, frame, direction):
+    """Finds the closest marker in the given direction, using a sorted index.  If more than one marker is at the best
+    frame, the first one in the scene markers is returned.
+    Arguments:
+        scene: the scene to search
+        frame: Integer frame to search from
+        direction: String, 'next', 'previous', or anything else to find the closest marker in either direction
+
+    Returns: A TimelineMarker, or None if none found"""
+
+    ensure_marker_index(scene)
+    before = None
+    after = None
+    if direction != 'next':
+        index = bisect_left(marker_frames, [frame])
+        if index > 0:
+            #first marker with the highest frame before the given frame
+            before = marker_frames[bisect_left(marker_frames, [marker_frames[index - 1][0]])]
+    if direction != 'previous':
+        if direction == 'next':
+            index = bisect_left(marker_frames, [frame + 1])
+        else:
+            index = bisect_left(marker_frames, [frame])
+        if index < len(marker_frames):
+            after = marker_frames[index]
+    if before and after:
+        before_delta = frame - before[0]
+        after_delta = after[0] - frame
+        if before_delta < after_delta or (before_delta == after_delta and before[1] < after[1]):
+            found = before
+        else:
+            found = after
+    else:
+        found = before or after
+    if found is None:
+        return None
+    return scene.timeline_markers[found[1]]
 
 
 #Meta strip manipulations
@@ -144,6 +729,31 @@ def current_selected(context):
         return []
 
 
+def level_sequences(scene):
+    """Finds the sequences of the meta strip currently being edited, or the top level sequences if not in a meta strip.
+    These are the same sequences as context.sequences, but can be searched by name.
+    Argument:
+        scene: the current Scene
+
+    Returns: Collection of VSE Sequence objects, or None if the scene has no sequence editor"""
+
+    try:
+        sequence_editor = scene.sequence_editor
+        if sequence_editor.meta_stack:
+            return sequence_editor.meta_stack[-1].sequences
+        return sequence_editor.sequences
+    except AttributeError:
+        return None
+
+
+def level_key(scene):
+    #Identifies a scene and the meta strip being edited in it, used to tell if an index was built for the current level
+    try:
+        return scene.name, tuple(meta.name for meta in scene.sequence_editor.meta_stack)
+    except AttributeError:
+        return None
+
+
 def current_sequences(context):
     sequences = context.sequences
     if sequences:
@@ -181,7 +791,8 @@ def find_timeline_height(sequences):
 def sequences_after_frame(sequences, frame, add_locked=True, add_parented=True, add_effect=True):
     """Finds sequences after a given frame
     Arguments:
-        sequences: List containing the VSE Sequence objects that will be searched
+        sequences: List containing the VSE Sequence objects that will be searched, if None, the strip span index of
+            the current sequences will be used
         frame: Integer, the frame to check for sequences following
         add_locked: Boolean, if false, locked sequences will be ignored
         add_parented: Boolean, if false, sequences with a set parent will be ignored
@@ -189,6 +800,8 @@ def sequences_after_frame(sequences, frame, add_locked=True, add_parented=True,
 
     Returns: A list of VSE Sequence objects"""
     update_sequences = []
+    if sequences is None:
+        sequences = [span[0] for span in find_span_sequences(frame, float('inf'))]
     for seq in sequences:
         if seq.frame_final_start >= frame:
             #sequence starts after frame
@@ -204,7 +817,8 @@ def sequences_after_frame(sequences, frame, add_locked=True, add_parented=True,
 def sequences_between_frames(sequences, start_frame, end_frame, add_locked=True, add_parented=True, add_effect=True):
     """Finds sequences that are visible between two given frames
     Arguments:
-        sequences: List containing the VSE Sequence objects that will be searched
+        sequences: List containing the VSE Sequence objects that will be searched, if None, the strip span index of
+            the current sequences will be used
         start_frame: Integer, beginning frame number to search at
         end_frame: Integer, ending frame to search at
         add_locked: Boolean, if false, locked sequences will be ignored
@@ -213,6 +827,8 @@ def sequences_between_frames(sequences, start_frame, end_frame, add_locked=True,
 
     Returns: A list of VSE Sequence objects"""
     update_sequences = []
+    if sequences is None:
+        sequences = [span[0] for span in find_span_sequences(start_frame, end_frame)]
     for seq in sequences:
         if seq.frame_final_start >= start_frame and seq.frame_final_end <= end_frame:
             if (not seq.lock) or add_locked:
@@ -243,89 +859,85 @@ def find_close_sequence(sequences, selected_sequence, direction, mode='overlap',
     Returns: VSE Sequence object, or Boolean False if no matching sequence is found
     :rtype: bpy.types.Sequence"""
 
-    overlap_nexts = []
-    overlap_previous = []
-    nexts = []
-    previous = []
-    found = None
+    ensure_neighbour_index(sequences)
+    try:
+        return search_neighbours(sequences, selected_sequence, direction, mode, sounds, effects, children)
+    except LookupError:
+        #strips were renamed or reordered since the index was built
+        invalidate_neighbour_index()
+        ensure_neighbour_index(sequences)
+        return search_neighbours(sequences, selected_sequence, direction, mode, sounds, effects, children)
+
+
+def search_neighbours(sequences, selected_sequence, direction, mode, sounds, effects, children):
+    #searches the neighbour index for find_close_sequence
+    selected_start = selected_sequence.frame_final_start
+    selected_end = selected_sequence.frame_final_end
+    selected_channel = selected_sequence.channel
+    inf = float('inf')
+
+    def usable(position):
+        current_sequence = neighbour_sequence(sequences, position)
+        #don't bother with sound or effect type sequences
+        if current_sequence.type == 'SOUND' and not sounds:
+            return False
+        #check if the sequence is a child of another, ignore if needed
+        if not children:
+            if parenting.find_parent(current_sequence):
+                return False
+        #check if the sequence is an effect of the selected sequence, ignore if so
+        if hasattr(current_sequence, 'input_1'):
+            if current_sequence.input_1 == selected_sequence or not effects:
+                return False
+        return True
 
     if mode == 'simple':
-        nexts = []
-        previous = []
-        for current_sequence in sequences:
-            #don't bother with sound or effect type sequences
-            if (current_sequence.type != 'SOUND') or sounds:
-                #check if the sequence is a child of another, ignore if needed
-                if not children:
-                    if parenting.find_parent(current_sequence):
-                        continue
-                #check if the sequence is an effect of the selected sequence, ignore if so
-                if hasattr(current_sequence, 'input_1'):
-                    if current_sequence.input_1 == selected_sequence or not effects:
-                        continue
-                if current_sequence.frame_final_start <= selected_sequence.frame_final_start and current_sequence != selected_sequence:
-                    previous.append(current_sequence)
-                elif current_sequence.frame_final_start >= selected_sequence.frame_final_start and current_sequence != selected_sequence:
-                    nexts.append(current_sequence)
         if direction == 'next':
-            if len(nexts) > 0:
-                found = min(nexts, key=lambda seq: (seq.frame_final_start - selected_sequence.frame_final_start))
+            #strips starting on the same frame count as previous
+            return walk_neighbours(sequences, neighbour_starts, bisect_left(neighbour_starts, [selected_start, inf]), 1, lambda position: neighbour_sequence(sequences, position) != selected_sequence and usable(position))
+        else:
+            return walk_neighbours(sequences, neighbour_starts, bisect_left(neighbour_starts, [selected_start, inf]) - 1, -1, lambda position: neighbour_sequence(sequences, position) != selected_sequence and usable(position))
+
+    if mode == 'overlap':
+        found = None
+        best = None
+        if direction == 'next':
+            #strips with a start point overlapping the selected strip
+            first = bisect_left(neighbour_starts, [selected_start, inf])
+            last = bisect_left(neighbour_starts, [selected_end])
+            candidates = [position for start, position in neighbour_starts[first:last] if neighbour_positions[position][2] > selected_end]
         else:
-            if len(previous) > 0:
-                found = min(previous, key=lambda seq: (selected_sequence.frame_final_start - seq.frame_final_start))
+            #strips with an end point overlapping the selected strip
+            first = bisect_left(neighbour_ends, [selected_start, inf])
+            last = bisect_left(neighbour_ends, [selected_end])
+            candidates = [position for end, position in neighbour_ends[first:last] if neighbour_positions[position][1] < selected_start]
+        for position in sorted(candidates):
+            if usable(position):
+                distance = abs(neighbour_positions[position][0] - selected_channel)
+                if best is None or distance < best:
+                    best = distance
+                    found = neighbour_sequence(sequences, position)
+        return found
+
+    if mode == 'channel':
+        starts = neighbour_channel_starts.get(selected_channel, [])
+        ends = neighbour_channel_ends.get(selected_channel, [])
     else:
-        #iterate through sequences to find all sequences to one side of the selected sequence
-        for current_sequence in sequences:
-            #don't bother with sound or effect type sequences
-            if (current_sequence.type != 'SOUND') or sounds:
-                #check if the sequence is a child of another, ignore if needed
-                if not children:
-                    if parenting.find_parent(current_sequence):
-                        continue
-                #check if the sequence is an effect of the selected sequence, ignore if so
-                if hasattr(current_sequence, 'input_1'):
-                    if current_sequence.input_1 == selected_sequence or not effects:
-                        continue
-                if current_sequence.frame_final_start >= selected_sequence.frame_final_end:
-                    #current sequence is after selected sequence
-                    if not (mode == 'channel' and selected_sequence.channel != current_sequence.channel):
-                        #dont append if channel mode and sequences are not on same channel
-                        nexts.append(current_sequence)
-                elif current_sequence.frame_final_end <= selected_sequence.frame_final_start:
-                    #current sequence is before selected sequence
-                    if not (mode == 'channel' and selected_sequence.channel != current_sequence.channel):
-                        #dont append if channel mode and sequences are not on same channel
-                        previous.append(current_sequence)
-                if (current_sequence.frame_final_start > selected_sequence.frame_final_start) & (current_sequence.frame_final_start < selected_sequence.frame_final_end) & (current_sequence.frame_final_end > selected_sequence.frame_final_end):
-                    #current sequence startpoint is overlapping selected sequence
-                    overlap_nexts.append(current_sequence)
-                if (current_sequence.frame_final_end > selected_sequence.frame_final_start) & (current_sequence.frame_final_end < selected_sequence.frame_final_end) & (current_sequence.frame_final_start < selected_sequence.frame_final_start):
-                    #current sequence endpoint is overlapping selected sequence
-                    overlap_previous.append(current_sequence)
-
-        nexts_all = nexts + overlap_nexts
-        previous_all = previous + overlap_previous
+        starts = neighbour_starts
+        ends = neighbour_ends
+    if mode == 'channel' or mode == 'nooverlap':
         if direction == 'next':
-            if mode == 'overlap':
-                if len(overlap_nexts) > 0:
-                    found = min(overlap_nexts, key=lambda overlap: abs(overlap.channel - selected_sequence.channel))
-            elif mode == 'channel' or mode == 'nooverlap':
-                if len(nexts) > 0:
-                    found = min(nexts, key=lambda next_seq: (next_seq.frame_final_start - selected_sequence.frame_final_end))
-            else:
-                if len(nexts_all) > 0:
-                    found = min(nexts_all, key=lambda next_seq: (next_seq.frame_final_start - selected_sequence.frame_final_end))
+            #strips starting after the selected strip ends
+            return walk_neighbours(sequences, starts, bisect_left(starts, [selected_end]), 1, usable)
         else:
-            if mode == 'overlap':
-                if len(overlap_previous) > 0:
-                    found = min(overlap_previous, key=lambda overlap: abs(overlap.channel - selected_sequence.channel))
-            elif mode == 'channel' or mode == 'nooverlap':
-                if len(previous) > 0:
-                    found = min(previous, key=lambda prev: (selected_sequence.frame_final_start - prev.frame_final_end))
-            else:
-                if len(previous_all) > 0:
-                    found = min(previous_all, key=lambda prev: (selected_sequence.frame_final_start - prev.frame_final_end))
-    return found
+            #strips ending before the selected strip starts
+            return walk_neighbours(sequences, ends, bisect_left(ends, [selected_start, inf]) - 1, -1, usable)
+    if direction == 'next':
+        #strips starting after the selected strip ends, or starting inside the selected strip and ending after it
+        return walk_neighbours(sequences, starts, bisect_left(starts, [selected_start, inf]), 1, lambda position: (neighbour_positions[position][1] >= selected_end or neighbour_positions[position][2] > selected_end) and usable(position))
+    else:
+        #strips ending before the selected strip starts, or ending inside the selected strip and starting before it
+        return walk_neighbours(sequences, ends, bisect_left(ends, [selected_end]) - 1, -1, lambda position: (neighbour_positions[position][2] <= selected_start or neighbour_positions[position][1] < selected_start) and usable(position))
 
 
 def sequencer_used_height(left, right, sequences=None):
@@ -333,17 +945,20 @@ def sequencer_used_height(left, right, sequences=None):
     top = 0
     bottom = 0
     if not sequences:
-        sequences = current_sequences(bpy.context)
-    for seq in sequences:
-        start = seq.frame_final_start
-        end = seq.frame_final_end
+        #no sequence list given, check the span index of the current sequences
+        spans = find_spans(left, right)
+    else:
+        spans = []
+        for seq in sequences:
+            spans.append([seq.name, seq.channel, seq.frame_final_start, seq.frame_final_end])
+    for name, channel, start, end in spans:
         if (start > left and start < right) or (end > left and end < right) or (start < left and end > right):
             if bottom == 0:
-                bottom = seq.channel
-            elif seq.channel < bottom:
-                bottom = seq.channel
-            if seq.channel > top:
-                top = seq.channel
+                bottom = channel
+            elif channel < bottom:
+                bottom = channel
+            if channel > top:
+                top = channel
     return [bottom, top]
 
 
@@ -366,7 +981,7 @@ def sequencer_area_filled(left, right, bottom, top, omit, sequences=False, quick
         bottom: Lowest channel of the area to check
         top: Highest channel of the area to check, set to -1 for infinite range
         omit: List of sequences to ignore
-        sequences: List of sequences to check, if not given, bpy.context.scene.sequence_editor.sequences will be used
+        sequences: List of sequences to check, if not given, the strip span index of the current sequences will be used
         quick: If True, the function will stop iterating and return True on the first match, otherwise returns list of
             all matches
 
@@ -381,7 +996,21 @@ def sequencer_area_filled(left, right, bottom, top, omit, sequences=False, quick
             bottom = old_top
     matches = []
     if not sequences:
-        sequences = current_sequences(bpy.context)
+        #no sequence list given, check the span index of the current sequences
+        omit_names = [sequence.name for sequence in omit]
+        for name, channel, start, end in find_spans(left, right, bottom, top):
+            if name not in omit_names:
+                #strip start is inside area             strip end is inside area         entire strip is covering area
+                if (start >= left and start < right) or (end > left and end <= right) or (start <= left and end >= right):
+                    if quick:
+                        return True
+                    else:
+                        sequence = parenting.lookup_sequence(name)
+                        if sequence is not None:
+                            matches.append(sequence)
+        if matches and not quick:
+            return matches
+        return False
     for sequence in sequences:
         if sequence not in omit:
             if sequence.channel >= bottom and (sequence.channel <= top or top == -1):
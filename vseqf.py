@@ -1,9 +1,18 @@
 import bpy
+import bgl
 import gpu
 import blf
 import math
+import time
+import functools
+from collections import deque
 from gpu_extras.batch import batch_for_shader
 
+#Instrumentation, run times of instrumented functions are only recorded while this is True
+instrumentation_enabled = False
+instrumentation_samples = 500  #number of most recent run times kept for each function
+timings = {}  #name: Timing
+
 
 class VSEQFTempSettings(object):
     """Substitute for the addon preferences when this script isn't loaded as an addon"""
@@ -15,6 +24,8 @@ class VSEQFTempSettings(object):
     cuts = True
     edit = True
     threepoint = True
+    peak_cache_directory = ''
+    peak_cache_size = 256
 
 
 def add_to_value(value, character, is_float=True):
@@ -94,6 +105,67 @@ def draw_text(x, y, size, text, justify='left', color=(1.0, 1.0, 1.0, 1.0)):
     blf.draw(font_id, text)
 
 
+class OverlayBatch(object):
+    """Collects the shapes and text of an overlay so they can be drawn together.  All rectangles and triangles are
+    drawn in one draw call, all lines in another, then the text is drawn on top.
+
+    Usage:
+        overlay = OverlayBatch()
+        overlay.add_rect(0, 0, 10, 10, color=(1, 0, 0, 0.5))
+        overlay.add_text(0, 12, 10, 'Text')
+        overlay.draw()"""
+
+    def __init__(self):
+        self.tri_coords = []
+        self.tri_colors = []
+        self.line_coords = []
+        self.line_colors = []
+        self.texts = []
+
+    def add_line(self, sx, sy, ex, ey, color=(1.0, 1.0, 1.0, 1.0)):
+        self.line_coords.append((sx, sy))
+        self.line_coords.append((ex, ey))
+        self.line_colors.append(color)
+        self.line_colors.append(color)
+
+    def add_rect(self, x, y, w, h, color=(1.0, 1.0, 1.0, 1.0)):
+        self.tri_coords.extend(((x, y), (x+w, y), (x, y+h), (x, y+h), (x+w, y), (x+w, y+h)))
+        self.tri_colors.extend((color, color, color, color, color, color))
+
+    def add_tri(self, v1, v2, v3, color=(1.0, 1.0, 1.0, 1.0)):
+        self.tri_coords.extend((v1, v2, v3))
+        self.tri_colors.extend((color, color, color))
+
+    def add_text(self, x, y, size, text, justify='left', color=(1.0, 1.0, 1.0, 1.0)):
+        self.texts.append((x, y, size, text, justify, color))
+
+    def clear(self):
+        self.tri_coords.clear()
+        self.tri_colors.clear()
+        self.line_coords.clear()
+        self.line_colors.clear()
+        self.texts.clear()
+
+    def draw(self, blend=True):
+        #Draws everything that has been added, shapes are drawn first and text last
+        if self.tri_coords or self.line_coords:
+            shader = gpu.shader.from_builtin('2D_SMOOTH_COLOR')
+            if blend:
+                bgl.glEnable(bgl.GL_BLEND)
+            shader.bind()
+            if self.tri_coords:
+                batch = batch_for_shader(shader, 'TRIS', {'pos': self.tri_coords, 'color': self.tri_colors})
+                batch.draw(shader)
+            if self.line_coords:
+                batch = batch_for_shader(shader, 'LINES', {'pos': self.line_coords, 'color': self.line_colors})
+                batch.draw(shader)
+            if blend:
+                bgl.glDisable(bgl.GL_BLEND)
+        for text in self.texts:
+            x, y, size, text, justify, color = text
+            draw_text(x, y, size, text, justify=justify, color=color)
+
+
 #Miscellaneous Functions
 def get_prefs():
     if __name__ in bpy.context.preferences.addons:
@@ -208,3 +280,151 @@ def timecode_from_frames(frame, fps, levels=0, subsecond_type='miliseconds', mod
         if negative:
             time_text = '-'+time_text
         return time_text
+
+
+def frames_from_timecode(timecode, fps):
+    """Converts a timecode in the format HH:MM:SS:FF to a frame number, fewer elements may be given, and a plain
+    number is treated as a frame number.
+    Arguments:
+        timecode: String timecode
+        fps: Number of frames per second
+
+    Returns: An integer frame number, or None if the timecode could not be read"""
+
+    timecode = timecode.strip()
+    negative = timecode.startswith('-')
+    if negative:
+        timecode = timecode[1:]
+    try:
+        elements = [int(element) for element in timecode.replace('.', ':').split(':')]
+    except ValueError:
+        return None
+    if not elements or len(elements) > 4:
+        return None
+    frames = elements[-1]
+    seconds = 0
+    for multiplier, element in zip((1, 60, 3600), reversed(elements[:-1])):
+        seconds = seconds + element * multiplier
+    frame = int(round(seconds * fps)) + frames
+    if negative:
+        frame = 0 - frame
+    return frame
+
+
+#Instrumentation functions
+class Timing(object):
+    """Run time record of one instrumented function.  The total and count cover every call since the record was
+    cleared, the samples only keep the most recent calls."""
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.total = 0.0
+        self.samples = deque(maxlen=instrumentation_samples)
+
+    def add(self, duration):
+        self.count = self.count + 1
+        self.total = self.total + duration
+        self.samples.append(duration)
+
+    def percentile(self, percent):
+        #returns the run time that the given percent of recent calls were faster than
+        if not self.samples:
+            return 0.0
+        samples = sorted(self.samples)
+        return samples[int(round((len(samples) - 1) * percent / 100))]
+
+    def mean(self):
+        if not self.count:
+            return 0.0
+        return self.total / self.count
+
+
+def record_timing(name, duration):
+    timing = timings.get(name)
+    if timing is None:
+        timing = Timing(name)
+        timings[name] = timing
+    timing.add(duration)
+
+
+def clear_timings():
+    timings.clear()
+
+
+class Instrument(object):
+    """Context manager that records the run time of a block of code when instrumentation is enabled
+    Example:
+        with vseqf.Instrument('load_sounds'):
+            load_sounds()"""
+
+    def __init__(self, name):
+        self.name = name
+        self.start = None
+
+    def __enter__(self):
+        if instrumentation_enabled:
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.start is not None:
+            record_timing(self.name, time.perf_counter() - self.start)
+            self.start = None
+        return False
+
+
+def timed_call(name, function, args):
+    start = time.perf_counter()
+    try:
+        return function(*args)
+    finally:
+        record_timing(name, time.perf_counter() - start)
+
+
+def instrument(name):
+    """Decorator that records the run time of a function when instrumentation is enabled.  The wrapper takes the same
+    number of arguments as the function, since Blender checks the argument count of handlers and operator functions.
+    Argument:
+        name: String, name the run times are recorded under
+
+    Returns: A decorator function"""
+
+    def decorator(function):
+        argument_count = function.__code__.co_argcount
+        if argument_count == 0:
+            def wrapper():
+                if not instrumentation_enabled:
+                    return function()
+                return timed_call(name, function, ())
+        elif argument_count == 1:
+            def wrapper(a):
+                if not instrumentation_enabled:
+                    return function(a)
+                return timed_call(name, function, (a, ))
+        elif argument_count == 2:
+            def wrapper(a, b):
+                if not instrumentation_enabled:
+                    return function(a, b)
+                return timed_call(name, function, (a, b))
+        elif argument_count == 3:
+            def wrapper(a, b, c):
+                if not instrumentation_enabled:
+                    return function(a, b, c)
+                return timed_call(name, function, (a, b, c))
+        else:
+            def wrapper(*args):
+                if not instrumentation_enabled:
+                    return function(*args)
+                return timed_call(name, function, args)
+        functools.update_wrapper(wrapper, function)
+        wrapper.instrumented = True
+        return wrapper
+    return decorator
+
+
+def instrument_operator(cls):
+    #Wraps the execute function of an operator class to record its run time, does nothing if already wrapped
+    execute = cls.__dict__.get('execute')
+    if execute is not None and not getattr(execute, 'instrumented', False):
+        cls.execute = instrument(getattr(cls, 'bl_idname', cls.__name__))(execute)
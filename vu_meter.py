@@ -1,5 +1,10 @@
 import bpy
+import os
 import math
+import time
+import struct
+import hashlib
+import numpy
 from . import vseqf
 from . import fades
 from . import timeline
@@ -8,6 +13,20 @@ vu_max_delay = 0
 vu_meter_min = -60
 vu_meter_sweet_spot = 0.7
 
+#Peak tables of sound files, absolute sound file path: SoundPeaks
+sound_peaks = {}
+#Keys of sounds waiting to have their peak tables built in the background
+peak_build_queue = []
+peak_chunk_frames = 250  #number of frames of audio decoded at once when building a peak table
+peak_build_time = 0.02  #maximum time in seconds to spend building peak tables per timer tick
+clipping_chunk_frames = 1000  #number of frames of a strip checked per update of the clipping check
+
+#Peak sidecar files, header is followed by one float16 peak per channel per frame
+peak_file_extension = '.vseqfpeaks'
+peak_file_magic = b'VSEQFPK1'
+peak_file_header = struct.Struct('<8sHId')  #magic, channels, frames, fps
+peak_file_folder = 'vseqf_peaks'  #folder created next to the blend file if no cache directory is set
+
 
 def display_report(report):
     text_document = None
@@ -21,6 +40,421 @@ def display_report(report):
     text_document.from_string(report)
 
 
+class SoundPeaks(object):
+    """Table of the loudest sample of each channel on each frame of a sound, at a given fps.  Peak index 0 covers the
+    first frame of the sound."""
+
+    def __init__(self, sound_name, filepath, fps):
+        self.sound_name = sound_name
+        self.filepath = filepath
+        self.fps = fps
+        self.factory = None
+        self.length = 0
+        self.rate = 0
+        self.chunks = []
+        self.position = 0
+        self.complete = False
+        self.channel_peaks = numpy.zeros((0, 1))
+
+    def start_build(self, factory, length):
+        self.factory = factory
+        self.length = length
+        self.rate = factory.specs[0]
+        self.chunks = []
+        self.position = 0
+        self.complete = False
+
+    def finish_build(self, channel_peaks):
+        self.channel_peaks = channel_peaks
+        self.chunks = []
+        self.factory = None
+        self.complete = True
+
+    def build_chunk(self):
+        #Decodes the next chunk of audio and adds its peaks to the table, returns True when the table is complete
+        start = self.position
+        end = start + peak_chunk_frames
+        chunk_peaks = decode_channel_peaks(self.factory, self.rate, self.fps, start, end)
+        if len(chunk_peaks) > 0:
+            self.chunks.append(chunk_peaks)
+        self.position = end
+        if len(chunk_peaks) < end - start or self.position >= self.length:
+            if not self.chunks:
+                raise ValueError('No audio could be decoded from '+self.filepath)
+            self.finish_build(numpy.concatenate(self.chunks))
+            save_peak_file(self.filepath, self.fps, self.channel_peaks)
+        return self.complete
+
+    def peak(self, index):
+        if index < 0 or index >= len(self.channel_peaks):
+            return 0
+        return float(self.channel_peaks[index].max())
+
+    def peak_range(self, start, end):
+        #returns the peaks of the loudest channel for frames from start up to end
+        return numpy.asarray(self.channel_peaks[start:end], dtype=numpy.float32).max(axis=1)
+
+
+def decode_channel_peaks(factory, rate, fps, start, end):
+    """Decodes a range of a sound and finds the loudest sample of each channel on each frame
+    Arguments:
+        factory: aud.Sound to decode
+        rate: sample rate of the sound
+        fps: Float, frames per second to split the sound into
+        start: Integer, first frame of the sound to decode, frame 0 is the start of the sound
+        end: Integer, frame to stop decoding at, this frame is not included
+
+    Returns: A numpy array of peaks with a row for each frame and a column for each channel.  May be shorter than the
+        requested range if the sound ends"""
+
+    if end <= start:
+        return numpy.zeros((0, 1))
+    chunk = factory.limit(start / fps, end / fps).data()
+    if len(chunk) == 0:
+        return numpy.zeros((0, 1))
+    samples = numpy.abs(chunk)
+    if samples.ndim == 1:
+        samples = samples.reshape(-1, 1)
+    #find the first sample of each frame in this chunk, frames are not always a whole number of samples long
+    frames = numpy.arange(start, end)
+    offsets = numpy.round(frames * rate / fps).astype(numpy.int64) - int(round(start * rate / fps))
+    offsets = offsets[offsets < len(samples)]
+    return numpy.maximum.reduceat(samples, offsets, axis=0)
+
+
+def decode_peaks(factory, rate, fps, start, end):
+    #Same as decode_channel_peaks, but only returns the loudest channel of each frame
+    channel_peaks = decode_channel_peaks(factory, rate, fps, start, end)
+    if len(channel_peaks) == 0:
+        return numpy.zeros(0)
+    return channel_peaks.max(axis=1)
+
+
+#Peak sidecar file functions
+def get_peak_directory():
+    #Returns the folder that peak files are stored in, or None if there is nowhere to store them
+    prefs = vseqf.get_prefs()
+    directory = prefs.peak_cache_directory
+    if directory:
+        return bpy.path.abspath(directory)
+    if bpy.data.filepath:
+        return os.path.join(os.path.dirname(bpy.data.filepath), peak_file_folder)
+    return None
+
+
+def get_peak_file(filepath, fps):
+    """Finds the peak file name for a sound file, the name depends on the file path, size and modified time
+    Arguments:
+        filepath: String, path to the sound file
+        fps: Float, frames per second the peaks are calculated at
+
+    Returns: A full path to the peak file, or None if the sound file or peak folder cannot be found"""
+
+    directory = get_peak_directory()
+    if directory is None:
+        return None
+    sound_path = os.path.normpath(bpy.path.abspath(filepath))
+    try:
+        stat = os.stat(sound_path)
+    except OSError:
+        #sound is packed or missing
+        return None
+    key = sound_path+'|'+str(stat.st_size)+'|'+str(stat.st_mtime)+'|'+str(fps)
+    return os.path.join(directory, hashlib.sha1(key.encode('utf-8')).hexdigest()+peak_file_extension)
+
+
+def load_peak_file(filepath, fps):
+    """Memory-maps the peak file for a sound file if one exists
+    Arguments:
+        filepath: String, path to the sound file
+        fps: Float, frames per second the peaks are calculated at
+
+    Returns: A numpy memmap of peaks with a row for each frame and a column for each channel, or None"""
+
+    peak_file = get_peak_file(filepath, fps)
+    if peak_file is None or not os.path.isfile(peak_file):
+        return None
+    try:
+        with open(peak_file, 'rb') as file:
+            magic, channels, frames, file_fps = peak_file_header.unpack(file.read(peak_file_header.size))
+        if magic != peak_file_magic or file_fps != fps or channels < 1:
+            return None
+        if frames == 0:
+            return numpy.zeros((0, channels))
+        peaks = numpy.memmap(peak_file, dtype=numpy.float16, mode='r', offset=peak_file_header.size, shape=(frames, channels))
+        #update the modified time so the least recently used files are removed first
+        os.utime(peak_file, None)
+        return peaks
+    except (OSError, ValueError, struct.error):
+        return None
+
+
+def save_peak_file(filepath, fps, channel_peaks):
+    #Writes a peak file for a sound file, then removes old peak files if the folder is over the size limit
+    peak_file = get_peak_file(filepath, fps)
+    if peak_file is None:
+        return
+    directory = os.path.dirname(peak_file)
+    try:
+        os.makedirs(directory, exist_ok=True)
+        frames, channels = channel_peaks.shape
+        with open(peak_file, 'wb') as file:
+            file.write(peak_file_header.pack(peak_file_magic, channels, frames, fps))
+            file.write(numpy.asarray(channel_peaks, dtype=numpy.float16).tobytes())
+    except OSError:
+        return
+    prefs = vseqf.get_prefs()
+    limit = prefs.peak_cache_size
+    trim_peak_directory(directory, limit * 1024 * 1024, keep=peak_file)
+
+
+def trim_peak_directory(directory, limit, keep=None):
+    """Removes the least recently used peak files in a folder until the total size is under a limit
+    Arguments:
+        directory: String, folder to check
+        limit: Integer, maximum total size of the peak files in bytes
+        keep: String, optional path to a peak file that should never be removed"""
+
+    files = []
+    total = 0
+    try:
+        for name in os.listdir(directory):
+            if name.endswith(peak_file_extension):
+                path = os.path.join(directory, name)
+                stat = os.stat(path)
+                files.append([stat.st_mtime, stat.st_size, path])
+                total = total + stat.st_size
+    except OSError:
+        return
+    files.sort()
+    for modified, size, path in files:
+        if total <= limit:
+            break
+        if path == keep:
+            continue
+        try:
+            os.remove(path)
+            total = total - size
+        except OSError:
+            pass
+
+
+def evaluate_curve_range(fcurve, start, end):
+    """Evaluates an fcurve on every frame in a range.  Linear and constant segments between keyframes are worked out
+    from the keyframe points all at once, only bezier segments are evaluated one frame at a time.  Outside of the
+    keyframes the curve is flat unless it has modifiers or linear extrapolation.
+    Arguments:
+        fcurve: FCurve to evaluate
+        start: Integer, first frame
+        end: Integer, last frame, this frame is included
+
+    Returns: A numpy array of curve values, one for each frame"""
+
+    keyframes = fcurve.keyframe_points
+    count = len(keyframes)
+    if len(fcurve.modifiers) > 0 or fcurve.extrapolation != 'CONSTANT' or count == 0:
+        return numpy.array([fcurve.evaluate(frame) for frame in range(start, end + 1)])
+    points = numpy.empty(count * 2)
+    keyframes.foreach_get('co', points)
+    keys = points[0::2]
+    key_values = points[1::2]
+    frames = numpy.arange(start, end + 1, dtype=numpy.float64)
+
+    #frames before the first keyframe and from the last keyframe on have the value of that keyframe
+    values = numpy.empty(len(frames))
+    values.fill(key_values[0])
+    last = numpy.searchsorted(frames, keys[-1], 'left')
+    values[last:] = key_values[-1]
+    for index in range(count - 1):
+        #frames from this keyframe up to, but not including, the next keyframe
+        segment_start = numpy.searchsorted(frames, keys[index], 'left')
+        segment_end = numpy.searchsorted(frames, keys[index + 1], 'left')
+        if segment_start >= segment_end:
+            continue
+        interpolation = keyframes[index].interpolation
+        if interpolation == 'CONSTANT':
+            values[segment_start:segment_end] = key_values[index]
+        elif interpolation == 'LINEAR':
+            slope = (key_values[index + 1] - key_values[index]) / (keys[index + 1] - keys[index])
+            values[segment_start:segment_end] = key_values[index] + (frames[segment_start:segment_end] - keys[index]) * slope
+        else:
+            for frame_index in range(segment_start, segment_end):
+                values[frame_index] = fcurve.evaluate(frames[frame_index])
+    return values
+
+
+def strip_clipping_chunks(sequence, start, end):
+    """Splits the frames in a range where a sound strip is audible into chunks for the clipping check
+    Arguments:
+        sequence: VSE Sound Sequence object
+        start: Integer, first frame of the range
+        end: Integer, last frame of the range
+
+    Returns: A list of [name, first frame, last frame] lists"""
+
+    #a strip is audible on frames after its start and before its end, see timeline.under_cursor
+    first = max(start, int(math.floor(sequence.frame_final_start)) + 1)
+    last = min(end, int(math.ceil(sequence.frame_final_end)) - 1)
+    chunks = []
+    while first <= last:
+        chunk_last = min(first + clipping_chunk_frames - 1, last)
+        chunks.append([sequence.name, first, chunk_last])
+        first = chunk_last + 1
+    return chunks
+
+
+def strip_volume_range(context, sequence, first, last, depsgraph, fps):
+    """Finds the volume of a sound strip on each frame of a range, the same way get_volume_unit does for one frame
+    Arguments:
+        context: current context
+        sequence: VSE Sound Sequence object
+        first: Integer, first frame to check
+        last: Integer, last frame to check, this frame is included
+        depsgraph: evaluated depsgraph, used to get the sound data
+        fps: Float, the scene fps
+
+    Returns: A numpy array of volumes, one for each frame"""
+
+    length = last - first + 1
+    #the audio shown on a frame is the frame before it, relative to the strip start
+    sound_start = int(math.floor(first - 1 - sequence.frame_start))
+    sound_end = sound_start + length
+    peaks = get_sound_peaks(sequence, fps, depsgraph)
+    frame_peaks = numpy.zeros(length)
+    if peaks is not None:
+        table = peaks.peak_range(max(sound_start, 0), max(sound_end, 0))
+    else:
+        factory = sequence.sound.evaluated_get(depsgraph).factory
+        table = decode_peaks(factory, factory.specs[0], fps, max(sound_start, 0), max(sound_end, 0))
+    offset = max(0, -sound_start)
+    frame_peaks[offset:offset + len(table)] = table[:length - offset]
+
+    fcurve = fades.get_fade_curve(context, sequence, create=False)
+    if fcurve:
+        volumes = evaluate_curve_range(fcurve, first, last)
+    else:
+        volumes = sequence.volume
+    return frame_peaks * volumes
+
+
+def clipping_ranges(frames, volumes):
+    """Merges a list of clipping frames into ranges of frames next to each other
+    Arguments:
+        frames: numpy array of frame numbers, sorted
+        volumes: numpy array of volumes, one for each frame
+
+    Returns: A list of [first frame, last frame, maximum volume] lists"""
+
+    ranges = []
+    for frame, volume in zip(frames.tolist(), volumes.tolist()):
+        if ranges and ranges[-1][1] == frame - 1:
+            ranges[-1][1] = frame
+            if volume > ranges[-1][2]:
+                ranges[-1][2] = volume
+        else:
+            ranges.append([frame, frame, volume])
+    return ranges
+
+
+def build_sound_peaks():
+    #Timer function that builds queued peak tables a chunk at a time so the interface stays responsive
+    start_time = time.time()
+    while peak_build_queue:
+        key = peak_build_queue[0]
+        peaks = sound_peaks.get(key)
+        if peaks is None or peaks.complete:
+            peak_build_queue.pop(0)
+            continue
+        try:
+            if peaks.build_chunk():
+                peak_build_queue.pop(0)
+        except:
+            #sound could not be decoded, forget the table so the audio is read directly and the build is tried again later
+            del sound_peaks[key]
+            peak_build_queue.pop(0)
+        if time.time() - start_time > peak_build_time:
+            return 0.01
+    return None
+
+
+def stop_peak_building():
+    if bpy.app.timers.is_registered(build_sound_peaks):
+        bpy.app.timers.unregister(build_sound_peaks)
+    peak_build_queue.clear()
+
+
+def clear_sound_peaks():
+    #Stops building peak tables and forgets all stored ones, should be called when a different blend file is loaded
+    stop_peak_building()
+    sound_peaks.clear()
+
+
+def sound_peak_key(sound):
+    #Peak tables are stored by absolute file path, relative paths and sound names can match sounds in other blend files
+    if not sound.filepath:
+        return sound.name
+    return os.path.normpath(bpy.path.abspath(sound.filepath))
+
+
+def get_sound_peaks(sequence, fps, depsgraph):
+    """Finds the peak table for the sound used by a sound strip, and starts building it in the background if needed
+    Arguments:
+        sequence: VSE Sound Sequence object
+        fps: Float, the current scene fps
+        depsgraph: the evaluated depsgraph, used to get the sound data
+
+    Returns: A complete SoundPeaks object, or None if the table is not ready yet"""
+
+    sound = sequence.sound
+    if sound is None:
+        return None
+    key = sound_peak_key(sound)
+    peaks = sound_peaks.get(key)
+    if peaks is not None and peaks.fps == fps:
+        if peaks.complete:
+            return peaks
+        return None
+
+    #no table exists yet, or the sound or fps has changed
+    peaks = SoundPeaks(sound.name, sound.filepath, fps)
+    channel_peaks = load_peak_file(sound.filepath, fps)
+    if channel_peaks is not None:
+        #peaks were saved in a previous session
+        peaks.finish_build(channel_peaks)
+        sound_peaks[key] = peaks
+        return peaks
+    factory = sound.evaluated_get(depsgraph).factory
+    if factory is None:
+        return None
+    peaks.start_build(factory, sequence.frame_duration + 1)
+    sound_peaks[key] = peaks
+    if key not in peak_build_queue:
+        peak_build_queue.append(key)
+    if not bpy.app.timers.is_registered(build_sound_peaks):
+        bpy.app.timers.register(build_sound_peaks, first_interval=0.01)
+    return None
+
+
+def read_peak(audio, frame, frame_start, fps):
+    #Decodes the audio of one frame and returns the loudest sample
+    time_from = (frame - 1 - frame_start) / fps
+    time_to = (frame - frame_start) / fps
+    chunk = audio.limit(time_from, time_to).data()
+    if len(chunk) == 0:
+        #sometimes the chunks cannot be read properly, try to read 2 frames instead
+        time_from_temp = (frame - 2 - frame_start) / fps
+        chunk = audio.limit(time_from_temp, time_to).data()
+    if len(chunk) == 0:
+        #chunk still couldnt be read... just give up :\
+        return 0
+    chunk_max = abs(chunk.max())
+    chunk_min = abs(chunk.min())
+    if chunk_max > chunk_min:
+        return chunk_max
+    else:
+        return chunk_min
+
+
 def get_volume_unit(frame=None):
     total = 0
     if bpy.context.scene.sequence_editor is None:
@@ -35,24 +469,13 @@ def get_volume_unit(frame=None):
     fps = vseqf.get_fps()
     for sequence in sequences:
         if sequence.type == 'SOUND' and timeline.under_cursor(sequence, frame) and not sequence.mute:
-            time_from = (frame - 1 - sequence.frame_start) / fps
-            time_to = (frame - sequence.frame_start) / fps
-            audio = sequence.sound.evaluated_get(depsgraph).factory
-            chunk = audio.limit(time_from, time_to).data()
-            if len(chunk) == 0:
-                #sometimes the chunks cannot be read properly, try to read 2 frames instead
-                time_from_temp = (frame - 2 - sequence.frame_start) / fps
-                chunk = audio.limit(time_from_temp, time_to).data()
-            if len(chunk) == 0:
-                #chunk still couldnt be read... just give up :\
-                average = 0
+            peaks = get_sound_peaks(sequence, fps, depsgraph)
+            if peaks is not None:
+                average = peaks.peak(int(math.floor(frame - 1 - sequence.frame_start)))
             else:
-                max = abs(chunk.max())
-                min = abs(chunk.min())
-                if max > min:
-                    average = max
-                else:
-                    average = min
+                #peak table is still being built, decode the audio directly
+                audio = sequence.sound.evaluated_get(depsgraph).factory
+                average = read_peak(audio, frame, sequence.frame_start, fps)
             if evaluate_volume:
                 fcurve = fades.get_fade_curve(bpy.context, sequence, create=False)
                 if fcurve:
@@ -65,6 +488,7 @@ def get_volume_unit(frame=None):
     return total
 
 
+@vseqf.instrument('vu_meter_calculate')
 def vu_meter_calculate(scene):
     if scene != bpy.context.scene:
         return
@@ -171,43 +595,60 @@ def vu_meter_draw():
 
 
 class VUMeterCheckClipping(bpy.types.Operator):
+    """Checks every frame in the scene range for the combined volume of all sound strips going over 1.
+    Each sound strip is decoded once, in chunks of frames, and the volumes are added up for all frames at once."""
     bl_idname = 'vseqf.check_clipping'
     bl_label = 'Check For Audio Clipping'
 
     start = 0
     end = 0
-    current = 0
     percentage = 0
-    clipping = []
+    chunks = []
+    chunk_index = 0
+    mix = None
 
     def execute(self, context):
         self.percentage = 0
         scene = context.scene
         self.start = scene.frame_start
         self.end = scene.frame_end
-        self.current = self.start
+        self.mix = numpy.zeros(self.end - self.start + 1)
+        self.chunks = []
+        self.chunk_index = 0
+        if scene.sequence_editor is not None:
+            for sequence in scene.sequence_editor.sequences_all:
+                if sequence.type == 'SOUND' and not sequence.mute and sequence.sound is not None:
+                    self.chunks.extend(strip_clipping_chunks(sequence, self.start, self.end))
         self._timer = context.window_manager.event_timer_add(time_step=0.00001, window=context.window)
         context.window_manager.modal_handler_add(self)
         context.window_manager.progress_begin(0, 100)
-        self.clipping = []
         return {'RUNNING_MODAL'}
 
     def modal(self, context, event):
         if event.type in {'RIGHTMOUSE', 'ESC'}:
             self.end_modal(context)
             return {'CANCELLED'}
-        volume = get_volume_unit(self.current)
-        self.percentage = (self.current - self.start) / (self.end - self.start)
-        context.window_manager.progress_update(self.percentage)
-        if volume > 1:
-            self.clipping.append([self.current, volume])
-        self.current = self.current + 1
-        if self.current > self.end:
+        if self.chunk_index < len(self.chunks):
+            name, first, last = self.chunks[self.chunk_index]
+            sequence = context.scene.sequence_editor.sequences_all.get(name)
+            if sequence is not None:
+                depsgraph = context.evaluated_depsgraph_get()
+                volumes = strip_volume_range(context, sequence, first, last, depsgraph, vseqf.get_fps(context.scene))
+                self.mix[first - self.start:last - self.start + 1] += volumes
+            self.chunk_index = self.chunk_index + 1
+            self.percentage = self.chunk_index / len(self.chunks)
+            context.window_manager.progress_update(self.percentage)
+        if self.chunk_index >= len(self.chunks):
             self.end_modal(context)
-            if len(self.clipping) > 0:
-                clipped_report = 'Found '+str(len(self.clipping))+' frames with audio clipping:\n\n'
-                for clipped in self.clipping:
-                    clipped_report = clipped_report+'Frame '+str(clipped[0])+' clipping at volume '+str(clipped[1])+'\n'
+            clipped = numpy.nonzero(self.mix > 1)[0]
+            if len(clipped) > 0:
+                ranges = clipping_ranges(clipped + self.start, self.mix[clipped])
+                clipped_report = 'Found '+str(len(clipped))+' frames with audio clipping:\n\n'
+                for first, last, volume in ranges:
+                    if first == last:
+                        clipped_report = clipped_report+'Frame '+str(first)+' clipping at volume '+str(volume)+'\n'
+                    else:
+                        clipped_report = clipped_report+'Frames '+str(first)+'-'+str(last)+' clipping at max volume '+str(volume)+'\n'
             else:
                 clipped_report = 'No clipping found'
             self.report({'INFO'}, "Clipping report saved, check 'Clipping Report' in the text editor")
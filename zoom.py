@@ -3,18 +3,69 @@ from . import timeline
 from . import vseqf
 
 
-def zoom_custom(begin, end, bottom=None, top=None, preroll=True):
-    """Zooms to an area on the sequencer timeline by adding a temporary strip, zooming to it, then deleting that strip.
+def sequencer_region(context):
+    """Finds the timeline region of a sequencer area, using the area in context if it is a sequencer
+    Argument:
+        context: the current Context
+
+    Returns: An [area, region] list, or [None, None] if no sequencer timeline is open"""
+
+    areas = []
+    if context.area:
+        areas.append(context.area)
+    if context.window:
+        areas.extend(context.window.screen.areas)
+    for area in areas:
+        if area.type == 'SEQUENCE_EDITOR' and area.spaces.active.view_type != 'PREVIEW':
+            for region in area.regions:
+                if region.type == 'WINDOW':
+                    return [area, region]
+    return [None, None]
+
+
+def zoom_view(context, left, right, bottom=None, top=None):
+    """Moves and scales the sequencer timeline view to show an area.  The area is converted to region pixels and
+    passed to view2d.zoom_border, so no strips or selections are changed and no scene updates are caused.
+    Arguments:
+        context: the current Context
+        left: The leftmost visible frame
+        right: The rightmost visible frame
+        bottom: The lowest visible channel, if None, the current lowest visible channel is kept
+        top: The topmost visible channel, if None, the current topmost visible channel is kept
+
+    Returns: True if the view was zoomed, False if no sequencer timeline was found or the view could not be set"""
+
+    area, region = sequencer_region(context)
+    if region is None:
+        return False
+    view = region.view2d
+    if bottom is None:
+        bottom = view.region_to_view(0, 0)[1]
+    if top is None:
+        top = view.region_to_view(region.width, region.height)[1]
+
+    #zoom_border zooms the view to a box given in region pixels, the box may be outside of the region
+    region_left, region_bottom = view.view_to_region(left, bottom, clip=False)
+    region_right, region_top = view.view_to_region(right, top, clip=False)
+    if region_right <= region_left or region_top <= region_bottom:
+        #area is less than a pixel wide in the current view
+        return False
+    override = {'region': region, 'window': context.window, 'screen': context.screen, 'area': area, 'scene': context.scene}
+    try:
+        bpy.ops.view2d.zoom_border(override, xmin=region_left, xmax=region_right, ymin=region_bottom, ymax=region_top, wait_for_input=False, zoom_out=False)
+    except RuntimeError:
+        return False
+    return True
+
+
+def zoom_temporary_strip(begin, end):
+    """Zooms to an area by adding a temporary strip, zooming to it, then deleting that strip.  Only used when the view
+    cannot be set with zoom_view, since this causes scene updates.
     Note that this function will retain selected and active sequences.
     Arguments:
         begin: The starting frame of the zoom area
-        end: The ending frame of the zoom area
-        bottom: The lowest visible channel
-        top: The topmost visible channel
-        preroll: If true, add a buffer before the beginning"""
+        end: The ending frame of the zoom area"""
 
-    del bottom  #Add in someday...
-    del top     #Add in someday...
     scene = bpy.context.scene
     selected = []
 
@@ -32,18 +83,8 @@ def zoom_custom(begin, end, bottom=None, top=None, preroll=True):
             sequence.select = False
     active = timeline.current_active(bpy.context)
 
-    begin = int(begin)
-    end = int(end)
-
-    #Determine preroll for the zoom
-    zoomlength = end - begin
-    if zoomlength > 60 and preroll:
-        preroll = int(round((zoomlength-60) / 10))
-    else:
-        preroll = 0
-
     #Create a temporary sequence, zoom in on it, then delete it
-    zoom_clip = scene.sequence_editor.sequences.new_effect(name='----vseqf-temp-zoom----', type='ADJUSTMENT', channel=1, frame_start=begin - preroll, frame_end=end)
+    zoom_clip = scene.sequence_editor.sequences.new_effect(name='----vseqf-temp-zoom----', type='ADJUSTMENT', channel=1, frame_start=begin, frame_end=end)
     scene.sequence_editor.active_strip = zoom_clip
     for region in bpy.context.area.regions:
         if region.type == 'WINDOW':
@@ -58,6 +99,29 @@ def zoom_custom(begin, end, bottom=None, top=None, preroll=True):
         bpy.context.scene.sequence_editor.active_strip = active
 
 
+def zoom_custom(begin, end, bottom=None, top=None, preroll=True):
+    """Zooms to an area on the sequencer timeline by setting the timeline view.
+    Arguments:
+        begin: The starting frame of the zoom area
+        end: The ending frame of the zoom area
+        bottom: The lowest visible channel, if None, the vertical view is not changed
+        top: The topmost visible channel, if None, the vertical view is not changed
+        preroll: If true, add a buffer before the beginning"""
+
+    begin = int(begin)
+    end = int(end)
+
+    #Determine preroll for the zoom
+    zoomlength = end - begin
+    if zoomlength > 60 and preroll:
+        preroll = int(round((zoomlength-60) / 10))
+    else:
+        preroll = 0
+
+    if not zoom_view(bpy.context, begin - preroll, end, bottom=bottom, top=top):
+        zoom_temporary_strip(begin - preroll, end)
+
+
 def zoom_cursor(self=None, context=None):
     """Zooms near the cursor based on the 'zoom_size' vseqf variable"""
     del self